@@ -0,0 +1,219 @@
+import json
+import math
+import threading
+import time
+from collections import deque
+
+from autogen_agentchat.base import Response, TaskResult
+from autogen_agentchat.messages import (
+    ModelClientStreamingChunkEvent,
+    ToolCallExecutionEvent,
+    ToolCallRequestEvent,
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RollingHistogram:
+    """Keeps the most recent ``window`` samples for percentile queries, plus lifetime count/sum"""
+
+    def __init__(self, window=2048):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self._samples.append(value)
+        self.count += 1
+        self.sum += value
+
+    @staticmethod
+    def _nearest_rank(ordered, q):
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)] if ordered else None
+
+    def percentile(self, q):
+        return self._nearest_rank(sorted(self._samples), q)
+
+    def summary(self):
+        ordered = sorted(self._samples)
+        result = {"count": self.count, "sum": self.sum}
+        for q in QUANTILES:
+            result[f"p{int(q * 100)}"] = self._nearest_rank(ordered, q)
+        return result
+
+
+class RunRecorder:
+    """Timings and token usage for a single agent run"""
+
+    def __init__(self, collector):
+        self._collector = collector
+        self.started = time.perf_counter()
+        self.finished = None
+        self.first_event_at = None
+        self.first_token_at = None
+        self.last_event_at = self.started
+        self.event_counts = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tool_durations = []  # (tool name, seconds)
+        self._pending_tools = {}  # call id -> (name, started)
+
+    def observe(self, event, replayed=False):
+        """Record one event from run_stream/on_messages_stream.
+
+        ``replayed`` is for messages handed back after a non-streamed call
+        (``Response.inner_messages``): they are counted and their tokens
+        added, but they arrive all at once, so they set no timings.
+        """
+        now = time.perf_counter()
+        event_type = type(event).__name__
+        self.event_counts[event_type] = self.event_counts.get(event_type, 0) + 1
+        if not replayed:
+            self._collector.histogram("agent_event_latency_seconds", event_type=event_type).observe(now - self.last_event_at)
+            self.last_event_at = now
+            if self.first_event_at is None:
+                self.first_event_at = now
+
+        if isinstance(event, TaskResult):
+            # Repeats messages already seen on the stream
+            return
+        if isinstance(event, Response):
+            # on_messages_stream does not yield the final chat message separately
+            event = event.chat_message
+
+        usage = getattr(event, "models_usage", None)
+        if usage:
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+        if replayed:
+            return
+        if self.first_token_at is None and (
+            isinstance(event, ModelClientStreamingChunkEvent) or (usage and usage.completion_tokens)
+        ):
+            self.first_token_at = now
+
+        if isinstance(event, ToolCallRequestEvent):
+            for call in event.content:
+                self._pending_tools[call.id] = (call.name, now)
+        elif isinstance(event, ToolCallExecutionEvent):
+            for result in event.content:
+                name, started = self._pending_tools.pop(result.call_id, (result.name, now))
+                self.tool_durations.append((name, now - started))
+
+    def finish(self):
+        """Close the run and push its numbers into the collector's histograms"""
+        if self.finished is None:
+            self.finished = time.perf_counter()
+            self._collector._record_run(self)
+        return self
+
+    @property
+    def duration(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def time_to_first_event(self):
+        return None if self.first_event_at is None else self.first_event_at - self.started
+
+    @property
+    def time_to_first_token(self):
+        return None if self.first_token_at is None else self.first_token_at - self.started
+
+    def as_dict(self):
+        return {
+            "duration": self.duration,
+            "time_to_first_event": self.time_to_first_event,
+            "time_to_first_token": self.time_to_first_token,
+            "events": dict(self.event_counts),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tool_calls": [{"tool": name, "seconds": seconds} for name, seconds in self.tool_durations],
+        }
+
+
+class MetricsCollector:
+    """Rolling latency histograms across many agent runs, exportable as JSON or Prometheus text"""
+
+    HELP = {
+        "agent_run_seconds": "Wall time of an agent run",
+        "agent_time_to_first_event_seconds": "Time from run start to the first streamed event",
+        "agent_time_to_first_token_seconds": "Time from run start to the first model output",
+        "agent_event_latency_seconds": "Time since the previous event, by event type",
+        "agent_tool_call_seconds": "Time between a tool call request and its result",
+        "agent_prompt_tokens_per_second": "Prompt tokens per second of run time",
+        "agent_completion_tokens_per_second": "Completion tokens per second of run time",
+    }
+
+    def __init__(self, window=2048):
+        self.window = window
+        self.runs = 0
+        self._histograms = {}  # (name, labels) -> RollingHistogram
+        self._lock = threading.Lock()
+
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = RollingHistogram(self.window)
+            return self._histograms[key]
+
+    def start_run(self):
+        return RunRecorder(self)
+
+    async def observe_stream(self, events):
+        """Stream sink: record every event of one run and return its RunRecorder"""
+        run = self.start_run()
+        async for event in events:
+            run.observe(event)
+        return run.finish()
+
+    def _record_run(self, run):
+        with self._lock:
+            self.runs += 1
+        duration = run.duration
+        self.histogram("agent_run_seconds").observe(duration)
+        if run.time_to_first_event is not None:
+            self.histogram("agent_time_to_first_event_seconds").observe(run.time_to_first_event)
+        if run.time_to_first_token is not None:
+            self.histogram("agent_time_to_first_token_seconds").observe(run.time_to_first_token)
+        for name, seconds in run.tool_durations:
+            self.histogram("agent_tool_call_seconds", tool=name).observe(seconds)
+        if duration > 0:
+            self.histogram("agent_prompt_tokens_per_second").observe(run.prompt_tokens / duration)
+            self.histogram("agent_completion_tokens_per_second").observe(run.completion_tokens / duration)
+
+    def snapshot(self):
+        with self._lock:
+            items = sorted(self._histograms.items())
+        metrics = {}
+        for (name, labels), hist in items:
+            metrics.setdefault(name, []).append({"labels": dict(labels), **hist.summary()})
+        return {"runs": self.runs, "metrics": metrics}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self):
+        lines = ["# HELP agent_runs_total Completed agent runs", "# TYPE agent_runs_total counter", f"agent_runs_total {self.runs}"]
+        for name, series in self.snapshot()["metrics"].items():
+            lines.append(f"# HELP {name} {self.HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} summary")
+            for entry in series:
+                labels = [f'{k}="{v}"' for k, v in entry["labels"].items()]
+                for q in QUANTILES:
+                    value = entry[f"p{int(q * 100)}"]
+                    label_text = ",".join(labels + [f'quantile="{q}"'])
+                    lines.append(f"{name}{{{label_text}}} {'NaN' if value is None else repr(float(value))}")
+                suffix = "{" + ",".join(labels) + "}" if labels else ""
+                lines.append(f"{name}_sum{suffix} {entry['sum']!r}")
+                lines.append(f"{name}_count{suffix} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Write metrics to path: Prometheus text for *.prom, JSON otherwise"""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus() if path.endswith(".prom") else self.to_json())
+
+
+# Shared collector for the agents in this project
+metrics = MetricsCollector()
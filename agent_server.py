@@ -0,0 +1,421 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from aiohttp import web
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import ModelClientStreamingChunkEvent
+from autogen_core import CancellationToken
+
+from agent_metrics import metrics
+from loop_profiler import loop_stats, profile_turn
+from state_store import STATE_DIR, StateStore
+from stream_tee import tee_stream
+
+POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "16"))
+MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", str(POOL_SIZE)))
+MAX_PENDING = int(os.getenv("AGENT_MAX_PENDING", "256"))
+MAX_SESSIONS = int(os.getenv("AGENT_MAX_SESSIONS", "10000"))
+QUEUE_TIMEOUT = float(os.getenv("AGENT_QUEUE_TIMEOUT", "30"))
+
+
+class ServerBusyError(Exception):
+    """Raised when a request cannot be admitted; maps to 503 with Retry-After"""
+
+    def __init__(self, reason, retry_after=1):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class _Slot:
+    __slots__ = ("agent", "session_id", "busy")
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.session_id = None
+        self.busy = False
+
+
+class AgentPool:
+    """Fixed set of pre-built agents leased to chat sessions.
+
+    A session stays pinned to its agent between turns, so the agent's own
+    conversation memory is used as-is. When every agent is pinned, the least
+    recently used idle session is reclaimed: its state is saved, the agent is
+    reset and handed over, and the saved state is loaded back if that session
+    returns later. Turns within one session run one at a time.
+
+    With a ``store``, each finished turn appends its new messages to the
+    session's log, so a reclaimed session needs no extra save and a session
+    from before a restart (or from another worker) resumes from disk.
+    """
+
+    def __init__(self, factory, size=POOL_SIZE, max_sessions=MAX_SESSIONS, store=None):
+        self._slots = [_Slot(factory()) for _ in range(size)]
+        self._free = deque(self._slots)
+        self._pinned = OrderedDict()  # session_id -> slot, least recently used first
+        self._saved = OrderedDict()  # session_id -> saved agent state
+        self._evicting = set()  # sessions whose state is being saved off a reclaimed slot
+        self.max_sessions = max_sessions
+        self.store = store
+        self._changed = asyncio.Condition()
+        self.leases = 0
+        self.reclaimed = 0
+        self.restored = 0
+        self.dropped_sessions = 0
+
+    def _idle_victim(self):
+        for slot in self._pinned.values():
+            if not slot.busy:
+                return slot
+        return None
+
+    async def _claim(self, session_id):
+        """Pick (under the condition lock) the slot this session will run on"""
+        while True:
+            slot = self._pinned.get(session_id)
+            if session_id in self._evicting:
+                # Its state is still being saved: resuming now would start from nothing
+                pass
+            elif slot is not None:
+                if not slot.busy:
+                    self._pinned.move_to_end(session_id)
+                    slot.busy = True
+                    return slot, None
+            elif self._free:
+                slot = self._free.popleft()
+                slot.busy = True
+                return slot, None
+            else:
+                slot = self._idle_victim()
+                if slot is not None:
+                    evicted = slot.session_id
+                    del self._pinned[evicted]
+                    slot.busy = True
+                    return slot, evicted
+            await self._changed.wait()
+
+    @contextlib.asynccontextmanager
+    async def lease(self, session_id):
+        """Hold the agent pinned to session_id for one turn"""
+        async with self._changed:
+            slot, evicted = await self._claim(session_id)
+            if evicted is not None:
+                self._evicting.add(evicted)
+            resumed = slot.session_id != session_id
+            if resumed:
+                slot.session_id = session_id
+                self._pinned[session_id] = slot
+        if evicted is not None:
+            # Saved and reset outside the lock so a slow reclaim does not hold up other leases;
+            # the evicted session waits in _claim until its state exists
+            try:
+                await self._save(evicted, await slot.agent.save_state())
+                await slot.agent.on_reset(CancellationToken())
+                self.reclaimed += 1
+            except BaseException:
+                async with self._changed:
+                    self._evicting.discard(evicted)
+                    del self._pinned[session_id]
+                    slot.session_id = None
+                    slot.busy = False
+                    self._free.append(slot)
+                    self._changed.notify_all()
+                raise
+            async with self._changed:
+                self._evicting.discard(evicted)
+                self._changed.notify_all()
+        try:
+            state = self._saved.pop(session_id, None)
+            if state is None and resumed and self.store is not None:
+                state = await self.store.load(session_id)
+            if state is not None:
+                await slot.agent.load_state(state)
+                self.restored += 1
+            self.leases += 1
+            yield slot.agent
+            if self.store is not None:
+                await self.store.save(session_id, await slot.agent.save_state())
+        finally:
+            async with self._changed:
+                slot.busy = False
+                self._changed.notify_all()
+
+    async def _save(self, session_id, state):
+        if self.store is not None:
+            # Usually a no-op: the session's last turn already appended everything
+            await self.store.save(session_id, state)
+            return
+        self._saved[session_id] = state
+        while len(self._saved) > self.max_sessions:
+            self._saved.popitem(last=False)
+            self.dropped_sessions += 1
+
+    async def end_session(self, session_id):
+        """Forget a session and return its agent to the free list"""
+        async with self._changed:
+            while session_id in self._evicting:
+                await self._changed.wait()
+            saved = self._saved.pop(session_id, None) is not None
+            if self.store is not None:
+                saved = await self.store.delete(session_id) or saved
+            slot = self._pinned.get(session_id)
+            if slot is None:
+                return saved
+            while slot.busy:
+                await self._changed.wait()
+            if self._pinned.get(session_id) is not slot:
+                return True
+            del self._pinned[session_id]
+            slot.busy = True
+        try:
+            await slot.agent.on_reset(CancellationToken())
+        finally:
+            async with self._changed:
+                slot.session_id = None
+                slot.busy = False
+                self._free.append(slot)
+                self._changed.notify_all()
+        return True
+
+    def stats(self):
+        return {
+            "agents": len(self._slots),
+            "busy": sum(slot.busy for slot in self._slots),
+            "free": len(self._free),
+            "pinned_sessions": len(self._pinned),
+            "saved_sessions": len(self._saved),
+            "leases": self.leases,
+            "reclaimed": self.reclaimed,
+            "restored": self.restored,
+            "dropped_sessions": self.dropped_sessions,
+            "store": self.store.stats() if self.store is not None else None,
+        }
+
+
+class Admission:
+    """Caps running turns at max_concurrency and waiting turns at max_pending; the rest are shed"""
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_pending=MAX_PENDING, queue_timeout=QUEUE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.pending = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @contextlib.asynccontextmanager
+    async def admit(self):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ServerBusyError("too many queued requests")
+        self.pending += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise ServerBusyError("timed out waiting for a free worker") from None
+        finally:
+            self.pending -= 1
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending,
+            "active": self.active,
+            "pending": self.pending,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+def _event_payload(event):
+    """Translate an agent stream item into an (SSE event name, JSON payload) pair, or None to skip it"""
+    if isinstance(event, ModelClientStreamingChunkEvent):
+        return "token", {"content": event.content}
+    if isinstance(event, TaskResult):
+        return "done", {"stop_reason": event.stop_reason}
+    if getattr(event, "source", None) == "user":
+        return None
+    return "message", {"type": event.type, "source": event.source, "content": event.to_text()}
+
+
+class AgentServer:
+    """aiohttp front-end serving many concurrent chats from one pool of agents.
+
+    POST /chat answers with JSON, POST /chat/stream answers with server-sent
+    events. Both take {"message": ..., "session_id": ...}; a session id is
+    created when none is given and returned in the X-Session-Id header.
+    """
+
+    def __init__(self, pool, prepare_task=None, admission=None):
+        self.pool = pool
+        self.prepare_task = prepare_task
+        self.admission = admission or Admission()
+
+    async def _read_request(self, request):
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise web.HTTPBadRequest(text="request body must be JSON")
+        message = body.get("message") if isinstance(body, dict) else None
+        if not isinstance(message, str) or not message.strip():
+            raise web.HTTPBadRequest(text='"message" must be a non-empty string')
+        return body.get("session_id") or uuid.uuid4().hex, message
+
+    async def _prepare(self, message):
+        # Called only once admitted: prepare_task makes the upstream weather calls
+        return await self.prepare_task(message) if self.prepare_task else message
+
+    def _busy(self, e):
+        return web.json_response(
+            {"error": str(e)}, status=503, headers={"Retry-After": str(e.retry_after)}
+        )
+
+    async def chat(self, request):
+        session_id, message = await self._read_request(request)
+        try:
+            async with self.admission.admit():
+                task = await self._prepare(message)
+                async with self.pool.lease(session_id) as agent, profile_turn(f"{agent.name}-{session_id}"):
+                    result = await agent.run(task=task)
+        except ServerBusyError as e:
+            return self._busy(e)
+        reply = result.messages[-1].to_text() if result.messages else ""
+        return web.json_response(
+            {"session_id": session_id, "reply": reply}, headers={"X-Session-Id": session_id}
+        )
+
+    async def chat_stream(self, request):
+        session_id, message = await self._read_request(request)
+        try:
+            async with self.admission.admit():
+                task = await self._prepare(message)
+                async with self.pool.lease(session_id) as agent:
+                    response = web.StreamResponse(
+                        headers={
+                            "Content-Type": "text/event-stream",
+                            "Cache-Control": "no-cache",
+                            "X-Session-Id": session_id,
+                        }
+                    )
+                    await response.prepare(request)
+                    cancellation_token = CancellationToken()
+
+                    async def send(events):
+                        async for event in events:
+                            payload = _event_payload(event)
+                            if payload is not None:
+                                try:
+                                    await response.write(_sse(*payload))
+                                except ConnectionResetError:
+                                    # Client went away: stop the model call now, not after an unread answer
+                                    cancellation_token.cancel()
+                                    raise
+
+                    try:
+                        async with profile_turn(f"{agent.name}-{session_id}"):
+                            await tee_stream(
+                                agent.run_stream(task=task, cancellation_token=cancellation_token),
+                                send,
+                                metrics.observe_stream,
+                            )
+                    except ConnectionResetError:
+                        # send already cancelled the run, and the tee closed it
+                        return response
+                    except Exception as e:
+                        await response.write(_sse("error", {"error": f"{type(e).__name__}: {e}"}))
+        except ServerBusyError as e:
+            return self._busy(e)
+        await response.write_eof()
+        return response
+
+    async def end_session(self, request):
+        found = await self.pool.end_session(request.match_info["session_id"])
+        return web.json_response({"ended": found}, status=200 if found else 404)
+
+    async def health(self, request):
+        return web.json_response(
+            {
+                "pool": self.pool.stats(),
+                "admission": self.admission.stats(),
+                "loop": loop_stats(),
+                "time": time.time(),
+            }
+        )
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/chat", self.chat)
+        app.router.add_post("/chat/stream", self.chat_stream)
+        app.router.add_delete("/sessions/{session_id}", self.end_session)
+        app.router.add_get("/healthz", self.health)
+        return app
+
+
+def build_server(
+    agent="weather", pool_size=POOL_SIZE, max_concurrency=MAX_CONCURRENCY, max_pending=MAX_PENDING, state_dir=STATE_DIR
+):
+    """Pool of weatherAgent or simpleAssistant agents behind the HTTP front-end; an empty state_dir keeps sessions in memory only"""
+    if agent == "weather":
+        import weatherAgent
+
+        factory, prepare_task = weatherAgent.make_agent, weatherAgent.prepare_task
+    else:
+        import simpleAssistant
+
+        factory, prepare_task = simpleAssistant.make_agent, None
+
+    store = StateStore(state_dir) if state_dir else None
+    pool = AgentPool(lambda: factory(model_client_stream=True), size=pool_size, store=store)
+    admission = Admission(max_concurrency=max_concurrency, max_pending=max_pending)
+    return AgentServer(pool, prepare_task=prepare_task, admission=admission)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the weather/assistant agents over HTTP with SSE streaming")
+    parser.add_argument("--agent", choices=("weather", "assistant"), default="weather")
+    parser.add_argument("--host", default=os.getenv("AGENT_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("AGENT_SERVER_PORT", "8080")))
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE, help="pre-built agents")
+    parser.add_argument("--max-concurrency", type=int, default=MAX_CONCURRENCY, help="turns running at once")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING, help="turns allowed to queue before shedding")
+    parser.add_argument("--state-dir", default=STATE_DIR, help="session log directory; empty string disables persistence")
+    args = parser.parse_args(argv)
+
+    async def make_app():
+        # The pool's condition and semaphores must be created on the serving loop
+        server = build_server(args.agent, args.pool_size, args.max_concurrency, args.max_pending, args.state_dir)
+        if args.agent == "weather":
+            from city_matcher import get_matcher
+
+            # Compile the city matcher before the first request instead of during it
+            await asyncio.to_thread(get_matcher)
+        print(f"🚀 Serving {args.agent} agents ({args.pool_size} in pool) on http://{args.host}:{args.port}")
+        return server.app()
+
+    web.run_app(make_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,24 @@
 import asyncio
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from dotenv import load_dotenv
-import os
+from lazy_clients import chat_client, shared
 
-load_dotenv()
 
-api_key = os.getenv("OPENAI_API_KEY")
-model_client = OpenAIChatCompletionClient(api_key=api_key, model="gpt-4o-mini")
-assistant = AssistantAgent(
-    model_client=model_client,
-    name="my_assistant",
-    system_message="You are a helpful assistant that can answer questions and help with tasks.",
-    description="Agent that tells you a joke")
+def make_agent(model_client=None):
+    from autogen_agentchat.agents import AssistantAgent
+    return AssistantAgent(
+        model_client=model_client or chat_client("openai"),
+        name="my_assistant",
+        system_message="You are a helpful assistant that can answer questions and help with tasks.",
+        description="Agent that tells you a joke")
 
+# Built on first use so importing this module stays cheap
+default_agent = shared(make_agent)
 
-async def main():
-    result = await assistant.run(task="tell me joke?")
+
+async def main(agent=None):
+    agent = agent or default_agent()
+    result = await agent.run(task="tell me joke?")
     print(result.messages[-1].content)
 
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
 
@@ -1,41 +1,48 @@
 import asyncio
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from dotenv import load_dotenv
 import os
-from pyowm import OWM
-from pyowm.utils import config
-from pyowm.utils import timestamps
+from lazy_clients import LazyWeatherManager, chat_client, shared
+from weather_cache import cached_weather_at_place
+from weather_tools import get_weather_many
+from weather_snapshot import get_snapshot
+from tool_executor import offload_tools
+from tool_format import compact_result
 
-load_dotenv()
-
-api_key = os.getenv("OPENAI_API_KEY")
-model_client = OpenAIChatCompletionClient(api_key=api_key, model="gpt-4o-mini")
-
-owm = OWM('OPENWEATHERMAP_API_KEY')
-weather_mgr = owm.weather_manager()
+# pyowm is imported and connected on the first lookup
+weather_mgr = LazyWeatherManager(os.getenv("OPENWEATHERMAP_API_KEY"))
 
 def getWeather(city: str) -> str:
-    observation = weather_mgr.weather_at_place('Chennai,IN')
-    weather = observation.weather
-    return f"Temperature: {weather.temperature('celsius')['temp']}°C"
+    city_name, _, country = city.partition(',')
+    observation = get_snapshot().lookup(city_name.strip(), country.strip())
+    if observation is None:
+        observation = cached_weather_at_place(weather_mgr, city_name.strip(), country.strip())
+    return f"Temperature: {observation.temp}°C"
 
 def addNumbers(a: int, b: int) -> str:
     return f"The sum of {a} and {b} is {a + b}"
 
-assistant = AssistantAgent(
-    model_client=model_client,
-    name="my_assistant",
-    system_message="You are a helpful assistant that can answer questions and help with tasks.",
-    description="Agent that tells you a joke",
-    tools=[getWeather, addNumbers])
+agent_tools = offload_tools([getWeather, addNumbers, compact_result(get_weather_many)], timeouts={"getWeather": 10}, hedged={"getWeather", "get_weather_many"})
+
+def make_agent(model_client=None):
+    from autogen_agentchat.agents import AssistantAgent
+    return AssistantAgent(
+        model_client=model_client or chat_client("openai"),
+        name="my_assistant",
+        system_message="You are a helpful assistant that can answer questions and help with tasks.",
+        description="Agent that tells you a joke",
+        tools=agent_tools)
 
-async def main():
-    result = await assistant.run(task="What is the weather in Chennai?")
+# Built on first use so importing this module stays cheap
+default_agent = shared(make_agent)
+
+async def main(agent=None):
+    agent = agent or default_agent()
+    result = await agent.run(task="What is the weather in Chennai?")
     print(result.messages[-1].content)
-    result = await assistant.run(task="What is the sum of 2 and 3?")
+    result = await agent.run(task="What is the sum of 2 and 3?")
     print(result.messages[-1].content)
     
 
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
+
 
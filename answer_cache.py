@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "off")
+CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join("data", "answer_cache.jsonl"))
+# Jaccard similarity of two questions' shingle sets needed to reuse an answer
+THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.8"))
+TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+WEATHER_TTL = float(os.getenv("ANSWER_CACHE_WEATHER_TTL", "300"))
+MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "10000"))
+# 16 bands of 4 rows: pairs from about 0.5 similarity up become candidates
+NUM_PERM = 64
+BANDS = 16
+
+# Answer lifetime for runs that used a tool; a run using a tool not listed here is not cached
+TOOL_TTLS = {
+    "addNumbers": TTL,
+    "getWeather": WEATHER_TTL,
+    "get_weather": WEATHER_TTL,
+    "get_weather_many": WEATHER_TTL,
+    "get_forecast": 1800.0,
+}
+
+# Only words that never change what is asked: pronouns, tense and verbs stay, so
+# "Who is ..." does not get the answer to "Who was ...", nor "Can I ..." that of "Can you ..."
+FILLER = frozenset("a an the of to for on in at by please".split())
+# Fewer content words than this is too little to tell two questions apart; such questions are not cached
+MIN_WORDS = int(os.getenv("ANSWER_CACHE_MIN_WORDS", "3"))
+_WORD = re.compile(r"\w+(?:['’]\w+)*")
+_PRIME = (1 << 61) - 1
+
+
+def shingles(question):
+    """Content words plus adjacent word pairs, so "What is the capital of France?" matches "what is capital of france"
+    but "Paris bigger than London" does not match its reverse; empty when there are fewer than MIN_WORDS words"""
+    words = [w for w in _WORD.findall(question.casefold().replace("’", "'")) if w not in FILLER]
+    if len(words) < MIN_WORDS:
+        return frozenset()
+    return frozenset(words) | frozenset(f"{a} {b}" for a, b in zip(words, words[1:]))
+
+
+def anchors(question):
+    """Tokens a reused answer must share exactly: numbers, and capitalised words past the first (names, places).
+
+    Swapping one of them barely moves the Jaccard score of a longer question,
+    yet "weather in Chennai" must not get the answer for "weather in Mumbai".
+    """
+    words = _WORD.findall(question.replace("’", "'"))
+    return frozenset(
+        w.casefold() for i, w in enumerate(words) if any(ch.isdigit() for ch in w) or (i and w[:1].isupper())
+    )
+
+
+def _stable_hash(shingle):
+    # Python's hash() is salted per process; signatures are rebuilt from disk, so they must not be
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _permutations(num_perm, seed=1):
+    digest = hashlib.sha256(f"minhash-{seed}".encode()).digest()
+    params = []
+    for i in range(num_perm):
+        digest = hashlib.sha256(digest).digest()
+        params.append((int.from_bytes(digest[:8], "little") % (_PRIME - 1) + 1, int.from_bytes(digest[8:16], "little") % _PRIME))
+    return params
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class _Entry:
+    __slots__ = ("question", "answer", "namespace", "shingles", "anchors", "signature", "expires_at")
+
+    def __init__(self, question, answer, namespace, shingles, signature, expires_at):
+        self.question = question
+        self.answer = answer
+        self.namespace = namespace
+        self.shingles = shingles
+        self.anchors = anchors(question)
+        self.signature = signature
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    """Near-duplicate question -> answer cache using MinHash signatures and LSH banding.
+
+    A question's shingles get a ``num_perm`` MinHash signature, split into
+    ``bands`` buckets; questions sharing any bucket are candidates, and the
+    best candidate whose exact shingle Jaccard reaches ``threshold`` and
+    whose numbers and names (``anchors``) are the same wins.
+    Entries carry their own expiry and are scoped by ``namespace`` (one per
+    agent). Puts are appended to ``path`` as JSON lines and replayed on
+    start, skipping expired entries; the file is rewritten once most of it
+    is dead.
+    """
+
+    def __init__(self, path=CACHE_PATH, threshold=THRESHOLD, ttl=TTL, num_perm=NUM_PERM, bands=BANDS, max_entries=MAX_ENTRIES):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self._perms = _permutations(num_perm)
+        self._entries = {}  # entry id -> _Entry
+        self._buckets = [{} for _ in range(bands)]  # band -> {(namespace, band values): set of entry ids}
+        self._next_id = 0
+        self._lines = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def signature(self, shingle_set):
+        hashes = [_stable_hash(s) for s in shingle_set] or [0]
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms)
+
+    def _band_keys(self, namespace, signature):
+        r = self.rows
+        return [(namespace, signature[i * r:(i + 1) * r]) for i in range(self.bands)]
+
+    def _insert(self, entry):
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = entry
+        for band, key in zip(self._buckets, self._band_keys(entry.namespace, entry.signature)):
+            band.setdefault(key, set()).add(entry_id)
+        if len(self._entries) > self.max_entries:
+            # Dicts keep insertion order, so the first id is the oldest entry
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        for band, key in zip(self._buckets, self._band_keys(entry.namespace, entry.signature)):
+            ids = band.get(key)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del band[key]
+
+    def lookup(self, question, namespace=""):
+        """Cached answer for the closest earlier question at or above the threshold, else None"""
+        shingle_set = shingles(question)
+        if not shingle_set:
+            # Too few content words ("what is it?"): such questions would look alike
+            return None
+        keys = self._band_keys(namespace, self.signature(shingle_set))
+        anchor_set = anchors(question)
+        now = time.time()
+        with self._lock:
+            candidates = set()
+            for band, key in zip(self._buckets, keys):
+                candidates |= band.get(key, set())
+            best, best_score = None, self.threshold
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if entry.expires_at <= now:
+                    self._remove(entry_id)
+                    continue
+                if entry.anchors != anchor_set:
+                    continue
+                score = jaccard(shingle_set, entry.shingles)
+                if score >= best_score:
+                    best, best_score = entry, score
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return best.answer
+
+    def put(self, question, answer, namespace="", ttl=None):
+        """Remember answer for question for ttl seconds (the cache default when None)"""
+        ttl = self.ttl if ttl is None else ttl
+        shingle_set = shingles(question)
+        if ttl <= 0 or not shingle_set:
+            return
+        entry = _Entry(question, answer, namespace, shingle_set, self.signature(shingle_set), time.time() + ttl)
+        with self._lock:
+            self._insert(entry)
+            self._persist(entry)
+
+    def _persist(self, entry):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        record = {"q": entry.question, "a": entry.answer, "ns": entry.namespace, "exp": entry.expires_at}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        self._lines += 1
+        if self._lines > 2 * len(self._entries) + 100:
+            self._rewrite()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        now = time.time()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._lines += 1
+                if record["exp"] > now:
+                    shingle_set = shingles(record["q"])
+                    self._insert(_Entry(record["q"], record["a"], record["ns"], shingle_set, self.signature(shingle_set), record["exp"]))
+        if self._lines > 2 * len(self._entries) + 100:
+            self._rewrite()
+
+    def _rewrite(self):
+        now = time.time()
+        live = [entry for entry in self._entries.values() if entry.expires_at > now]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in live:
+                f.write(json.dumps({"q": entry.question, "a": entry.answer, "ns": entry.namespace, "exp": entry.expires_at}) + "\n")
+        os.replace(tmp_path, self.path)
+        self._lines = len(live)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def answer_ttl(messages, default=None):
+    """Lifetime for an answer given the run's messages: the shortest TTL among the tools it called.
+
+    Returns 0 (do not cache) when a tool without a TTL policy was used.
+    """
+    ttl = default
+    for message in messages:
+        if type(message).__name__ != "ToolCallExecutionEvent":
+            continue
+        for result in message.content:
+            tool_ttl = TOOL_TTLS.get(result.name, 0.0)
+            ttl = tool_ttl if ttl is None else min(ttl, tool_ttl)
+    return ttl
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache, loaded from CACHE_PATH on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache()
+        return _cache
+
+
+async def cached_run(agent, question, task=None, namespace=None, ttl=None, key=None):
+    """Answer text for question: a cached answer to a near-identical question, or agent.run(task).
+
+    ``task`` is what the agent is given (defaults to question); the cache is
+    keyed on the question, plus ``key`` when given: answers built from live
+    data handed in through ``task`` pass what that data covers (e.g. the
+    places), and ``ttl`` to cap how long the answer is kept.
+    """
+    namespace = agent.name if namespace is None else namespace
+    if key:
+        namespace = f"{namespace}|{key}"
+    if ANSWER_CACHE == "on":
+        answer = get_cache().lookup(question, namespace)
+        if answer is not None:
+            return answer
+    result = await agent.run(task=question if task is None else task)
+    answer = result.messages[-1].to_text()
+    if ANSWER_CACHE == "on":
+        ttl = answer_ttl(result.messages, ttl)
+        get_cache().put(question, answer, namespace, ttl)
+    return answer
@@ -0,0 +1,305 @@
+import asyncio
+import json
+import math
+import re
+import threading
+import time
+import zlib
+from io import BytesIO
+from typing import Any, AsyncGenerator, Literal, Mapping, Optional, Sequence, Union
+
+from aiohttp import web
+from autogen_core import CancellationToken, FunctionCall
+from autogen_core.models import (
+    ChatCompletionClient,
+    CreateResult,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    ModelCapabilities,
+    ModelInfo,
+    RequestUsage,
+    UserMessage,
+)
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+
+FAKE_MODEL_INFO = {
+    "family": "unknown",
+    "vision": True,
+    "function_calling": True,
+    "json_output": False,
+    "structured_output": False,
+}
+
+
+def _text_of(message):
+    content = message.content
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part for part in content if isinstance(part, str))
+    return str(content)
+
+
+def _city_in(text):
+    match = re.search(r"\b(?:in|at|for|of)\s+([A-Z][\w]*(?:\s+[A-Z][\w]*)*)", text)
+    return match.group(1) if match else "Chennai"
+
+
+class FakeChatCompletionClient(ChatCompletionClient):
+    """Scripted model with fixed latency.
+
+    It calls a weather or math tool when the question asks for one and the tool
+    is offered; otherwise, and after tool results, it answers in plain text.
+    Token usage is a word count, so runs are fully reproducible.
+    """
+
+    def __init__(self, latency=0.05, token_latency=0.0, model_info=None):
+        self.latency = latency
+        self.token_latency = token_latency
+        self._model_info = model_info or FAKE_MODEL_INFO
+        self._total_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self._last_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    def _respond(self, messages, tools):
+        last = messages[-1]
+        tool_names = {tool.name if isinstance(tool, Tool) else tool["name"] for tool in tools}
+        content = None
+        if isinstance(last, FunctionExecutionResultMessage):
+            content = "Here is what I found: " + "; ".join(result.content[:120] for result in last.content)
+        elif isinstance(last, UserMessage):
+            text = _text_of(last)
+            lowered = text.lower()
+            # Like a real model, ask for every tool the question needs in one turn
+            calls = []
+            if "weather" in lowered and "getWeather" in tool_names:
+                calls.append(("getWeather", {"city": _city_in(text)}))
+            elif "weather" in lowered and "get_weather" in tool_names:
+                calls.append(("get_weather", {"city": _city_in(text)}))
+            if "sum" in lowered and "addNumbers" in tool_names:
+                a, b = (int(n) for n in (re.findall(r"-?\d+", text) + ["0", "0"])[:2])
+                calls.append(("addNumbers", {"a": a, "b": b}))
+            if calls:
+                content = [
+                    FunctionCall(id=f"call_{i}", name=name, arguments=json.dumps(arguments))
+                    for i, (name, arguments) in enumerate(calls, 1)
+                ]
+        if content is None:
+            content = f"Answer: {_text_of(last)[:200]}"
+
+        prompt_tokens = sum(len(_text_of(message).split()) for message in messages if hasattr(message, "content"))
+        completion_tokens = len(content.split()) if isinstance(content, str) else 10
+        usage = RequestUsage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        self._last_usage = usage
+        self._total_usage = RequestUsage(
+            prompt_tokens=self._total_usage.prompt_tokens + prompt_tokens,
+            completion_tokens=self._total_usage.completion_tokens + completion_tokens,
+        )
+        finish_reason = "stop" if isinstance(content, str) else "function_calls"
+        return CreateResult(finish_reason=finish_reason, content=content, usage=usage, cached=False)
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        await asyncio.sleep(self.latency)
+        return self._respond(messages, tools)
+
+    def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        async def _generator() -> AsyncGenerator[Union[str, CreateResult], None]:
+            await asyncio.sleep(self.latency)
+            result = self._respond(messages, tools)
+            if isinstance(result.content, str):
+                for word in result.content.split(" "):
+                    if self.token_latency:
+                        await asyncio.sleep(self.token_latency)
+                    yield word + " "
+            yield result
+
+        return _generator()
+
+    async def close(self) -> None:
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return self._last_usage
+
+    def total_usage(self) -> RequestUsage:
+        return self._total_usage
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return sum(len(_text_of(message).split()) for message in messages if hasattr(message, "content"))
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return 128000 - self.count_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore
+        return self._model_info
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self._model_info
+
+
+def fake_observation(city, lat=13.08, lon=80.27, metric=True):
+    """OWM-shaped current-weather payload whose values depend only on the city name"""
+    seed = zlib.crc32(city.lower().encode("utf-8"))
+    temp_c = 10 + seed % 25 + (seed % 10) / 10
+    to_unit = (lambda c: c) if metric else (lambda c: c + 273.15)
+    now = int(time.time())
+    return {
+        "coord": {"lon": lon, "lat": lat},
+        "weather": [{"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"}],
+        "base": "stations",
+        "main": {
+            "temp": round(to_unit(temp_c), 2),
+            "feels_like": round(to_unit(temp_c + 1.5), 2),
+            "temp_min": round(to_unit(temp_c - 2), 2),
+            "temp_max": round(to_unit(temp_c + 2), 2),
+            "pressure": 1000 + seed % 30,
+            "humidity": 40 + seed % 50,
+        },
+        "visibility": 10000,
+        "wind": {"speed": round(1 + seed % 80 / 10, 1), "deg": seed % 360},
+        "clouds": {"all": seed % 100},
+        "dt": now,
+        "sys": {"country": "IN", "sunrise": now - 6 * 3600, "sunset": now + 6 * 3600},
+        "timezone": 19800,
+        "id": seed % 1000000,
+        "name": city,
+        "cod": 200,
+    }
+
+
+def fake_forecast(place, periods=40):
+    """OWM-shaped 5-day / 3-hour forecast payload with a daily temperature cycle"""
+    seed = zlib.crc32(place.lower().encode("utf-8"))
+    start = int(time.time()) // 10800 * 10800
+    rows = []
+    for i in range(periods):
+        temp_c = 15 + seed % 15 + 6 * math.sin(i * math.pi / 4)
+        rows.append(
+            {
+                "dt": start + i * 10800,
+                "main": {"temp": round(temp_c, 2), "feels_like": round(temp_c + 1, 2), "humidity": 40 + (seed + i) % 50},
+                "weather": [{"id": 800, "main": "Clear", "description": "clear sky"}],
+                "wind": {"speed": round(1 + (seed + i) % 80 / 10, 1)},
+            }
+        )
+    return {"cod": "200", "cnt": periods, "list": rows, "city": {"name": place, "timezone": 19800}}
+
+
+class FakeWeatherServer:
+    """OpenWeatherMap look-alike (weather, geocoding, plus a test image) on its own thread and loop.
+
+    Running on a separate loop keeps it responsive even when the code under
+    test blocks the benchmark's event loop.
+    """
+
+    def __init__(self, latency=0.02, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._image = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def _weather(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        query = request.query
+        city = query.get("q", "").split(",")[0] or f"{query.get('lat')},{query.get('lon')}"
+        return web.json_response(fake_observation(city, metric=query.get("units") == "metric"))
+
+    async def _forecast(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        query = request.query
+        return web.json_response(fake_forecast(f"{query.get('lat')},{query.get('lon')}"))
+
+    async def _geocode(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        city, _, country = request.query.get("q", "").partition(",")
+        seed = zlib.crc32(city.lower().encode("utf-8"))
+        return web.json_response(
+            [{"name": city, "lat": (seed % 18000) / 100 - 90, "lon": (seed % 36000) / 100 - 180, "country": country or "IN"}]
+        )
+
+    async def _image_handler(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if self._image is None:
+            from PIL import Image
+
+            buffer = BytesIO()
+            Image.new("RGB", (200, 300), (120, 90, 60)).save(buffer, format="PNG")
+            self._image = buffer.getvalue()
+        return web.Response(body=self._image, content_type="image/png")
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_get("/data/2.5/weather", self._weather)
+        app.router.add_get("/data/2.5/forecast", self._forecast)
+        app.router.add_get("/geo/1.0/direct", self._geocode)
+        app.router.add_get("/id/{image_id}/{width}/{height}", self._image_handler)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._start())
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, name="fake-owm", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+
+def fake_weather_manager(server, api_key="benchmark"):
+    """A real pyowm WeatherManager whose HTTP client points at the fake server"""
+    from pyowm import OWM
+    from pyowm.commons.http_client import HttpClient
+    from pyowm.utils.config import get_default_config
+
+    config = get_default_config()
+    config["connection"]["use_ssl"] = False
+    mgr = OWM(api_key, config).weather_manager()
+    mgr.http_client = HttpClient(api_key, config, f"{server.host}:{server.port}/data/2.5", admits_subdomains=False)
+    return mgr
@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_fakes import FakeChatCompletionClient, FakeWeatherServer, fake_weather_manager
+
+SCENARIOS = ("first_agent", "agent_with_tools", "weather_agent", "messages")
+
+
+def configure_environment(server, workdir, cold_weather_cache):
+    """Point every script at the local stand-ins before any of them is imported"""
+    for key in ("OPENAI_API_KEY", "OPENROUTER_API_KEY", "OPENWEATHERMAP_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    os.environ["OWM_WEATHER_URL"] = f"{server.base_url}/data/2.5/weather"
+    os.environ["OWM_FORECAST_URL"] = f"{server.base_url}/data/2.5/forecast"
+    os.environ["OWM_GEOCODE_URL"] = f"{server.base_url}/geo/1.0/direct"
+    os.environ["GEOCODE_INDEX_PATH"] = os.path.join(workdir, "cities.idx")
+    os.environ["LLM_CACHE_MODE"] = "off"
+    os.environ["ANSWER_CACHE_PATH"] = os.path.join(workdir, "answer_cache.jsonl")
+    os.environ["AGENT_STATE_DIR"] = os.path.join(workdir, "agent_state")
+    os.environ["IMAGE_CACHE_DIR"] = os.path.join(workdir, "image_cache")
+    os.environ["LOOP_PROFILE_DIR"] = os.path.join(workdir, "profiles")
+    os.environ["WEATHER_SNAPSHOT_PATH"] = os.path.join(workdir, "weather.snap")
+    # The fake server has no quota; keep the scheduler from throttling the sweep
+    os.environ.setdefault("OWM_CALLS_PER_MINUTE", "1000000")
+    os.environ.setdefault("OWM_BURST", "1000")
+    if cold_weather_cache:
+        os.environ["WEATHER_CACHE_TTL"] = "0"
+        os.environ["WEATHER_CACHE_STALE_TTL"] = "0"
+
+
+def build_scenarios(server, llm_latency):
+    """Map scenario name -> coroutine function running one fresh, isolated agent session"""
+    from autogen_agentchat.agents import AssistantAgent
+
+    import agent_with_tools
+    import firstAgent
+    import messages_autogen
+    import weatherAgent
+    from owm_scheduler import scheduled
+
+    weather_mgr = scheduled(fake_weather_manager(server))
+    agent_with_tools.weather_mgr = weather_mgr
+    weatherAgent.weather_mgr = weather_mgr
+    image_url = f"{server.base_url}/id/237/200/300"
+
+    def llm():
+        return FakeChatCompletionClient(latency=llm_latency)
+
+    async def first_agent():
+        await firstAgent.main(AssistantAgent(model_client=llm(), name="my_assistant"))
+
+    async def with_tools():
+        agent = AssistantAgent(model_client=llm(), name="my_assistant", tools=agent_with_tools.agent_tools)
+        await agent_with_tools.main(agent)
+
+    async def weather_agent():
+        agent = weatherAgent.make_agent(llm())
+        await weatherAgent.chat_with_weather("What's the weather like in Chennai?", agent)
+
+    async def messages():
+        agent = AssistantAgent(model_client=llm(), name="my_assistant")
+        await messages_autogen.text_task(agent)
+        await messages_autogen.image_task(agent, image_url)
+
+    return {
+        "first_agent": first_agent,
+        "agent_with_tools": with_tools,
+        "weather_agent": weather_agent,
+        "messages": messages,
+    }
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_level(scenario, concurrency, runs):
+    """Run ``runs`` sessions with ``concurrency`` workers and summarise the latencies"""
+    from agent_metrics import RollingHistogram
+
+    latencies = RollingHistogram(window=runs)
+    errors = []
+    pending = iter(range(runs))
+
+    async def worker():
+        for _ in pending:
+            started = time.perf_counter()
+            try:
+                await scenario()
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+            latencies.observe(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "runs": runs,
+        "wall_seconds": wall,
+        "runs_per_sec": runs / wall if wall else None,
+        "p50": latencies.percentile(0.5),
+        "p99": latencies.percentile(0.99),
+        "peak_rss_mb": peak_rss_mb(),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+async def sweep(scenarios, names, levels, runs, warmup):
+    results = []
+    for name in names:
+        scenario = scenarios[name]
+        for _ in range(warmup):
+            await scenario()
+        for level in levels:
+            result = await run_level(scenario, level, runs)
+            results.append({"scenario": name, **result})
+    if "image_ingest" in sys.modules:
+        await sys.modules["image_ingest"].image_ingestor.close()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_results(results, baseline=None):
+    previous = {}
+    if baseline:
+        previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+
+    print("\n📊 Benchmark Results")
+    print("=" * 86)
+    print(f"{'scenario':<18}{'conc':>6}{'runs/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'rss MB':>10}{'errors':>8}  vs baseline")
+    for r in results:
+        line = (
+            f"{r['scenario']:<18}{r['concurrency']:>6}{r['runs_per_sec']:>10.1f}"
+            f"{r['p50'] * 1000:>10.1f}{r['p99'] * 1000:>10.1f}{r['peak_rss_mb']:>10.1f}{r['errors']:>8}"
+        )
+        old = previous.get((r["scenario"], r["concurrency"]))
+        if old:
+            line += f"  runs/s {(r['runs_per_sec'] / old['runs_per_sec'] - 1) * 100:+.1f}%"
+            line += f", p99 {(r['p99'] / old['p99'] - 1) * 100:+.1f}%"
+        print(line)
+        if r["first_error"]:
+            print(f"   ❌ {r['first_error']}")
+    print("=" * 86)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline latency/throughput benchmark for the agent scripts")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {SCENARIOS}")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--runs", type=int, default=50, help="sessions per concurrency level")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed sessions per scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake model latency per call (s)")
+    parser.add_argument("--owm-latency", type=float, default=0.02, help="fake OpenWeatherMap latency per request (s)")
+    parser.add_argument("--cold", action="store_true", help="disable the weather cache so every lookup goes upstream")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    server = FakeWeatherServer(latency=args.owm_latency).start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            configure_environment(server, workdir, args.cold)
+            print(f"🏁 Benchmarking {', '.join(names)} at concurrency {levels} ({args.runs} runs each)...")
+            # The scripts print every answer; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                scenarios = build_scenarios(server, args.llm_latency)
+                results = asyncio.run(sweep(scenarios, names, levels, args.runs, args.warmup))
+    finally:
+        server.stop()
+
+    from tool_format import savings
+    from weather_cache import weather_flights
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "upstream_requests": server.requests,
+        "coalesced_lookups": weather_flights.stats()["coalesced"],
+        "token_savings": savings.report(),
+        "images": sys.modules["image_ingest"].image_ingestor.stats() if "image_ingest" in sys.modules else None,
+        "results": results,
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    for tool, entry in report["token_savings"].items():
+        print(f"✂️  {tool}: {entry['saved_tokens']} prompt tokens saved over {entry['calls']} results")
+    if report["images"]:
+        images = report["images"]
+        print(f"🖼️  images: {images['downloads']} downloads, {images['bytes_in']} → {images['bytes_out']} bytes")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import asyncio
+import re
+import sys
+import threading
+
+from geocode_index import get_index, normalize_name
+
+# Single-word matches must be capitalized in the question and not one of these
+STOPWORDS = frozenset(
+    """a an and any are at be best can could day do does for from good hot how i in is it like me my near
+    now of on or please rain show sunny tell the there this to today tomorrow we weather week what when
+    where which will with you""".split()
+)
+# Words that may sit inside a multi-word name without being capitalized ("Rio de Janeiro")
+CONNECTORS = frozenset("de del da das do dos di la le les el al of on upon sur am an der den und y".split())
+PREPOSITIONS = frozenset(["in", "at", "for", "of", "near", "to", "from"])
+
+COUNTRY_NAMES = {
+    "argentina": "AR", "australia": "AU", "austria": "AT", "bangladesh": "BD", "belgium": "BE",
+    "brazil": "BR", "canada": "CA", "chile": "CL", "china": "CN", "colombia": "CO", "denmark": "DK",
+    "egypt": "EG", "england": "GB", "finland": "FI", "france": "FR", "germany": "DE", "greece": "GR",
+    "india": "IN", "indonesia": "ID", "iran": "IR", "ireland": "IE", "israel": "IL", "italy": "IT",
+    "japan": "JP", "kenya": "KE", "malaysia": "MY", "mexico": "MX", "nepal": "NP", "netherlands": "NL",
+    "new zealand": "NZ", "nigeria": "NG", "norway": "NO", "pakistan": "PK", "peru": "PE",
+    "philippines": "PH", "poland": "PL", "portugal": "PT", "russia": "RU", "saudi arabia": "SA",
+    "scotland": "GB", "singapore": "SG", "south africa": "ZA", "south korea": "KR", "spain": "ES",
+    "sri lanka": "LK", "sweden": "SE", "switzerland": "CH", "thailand": "TH", "turkey": "TR",
+    "uae": "AE", "uk": "GB", "ukraine": "UA", "united arab emirates": "AE", "united kingdom": "GB",
+    "united states": "US", "usa": "US", "us": "US", "vietnam": "VN",
+}
+
+_TOKEN = re.compile(r"\w+(?:['’]\w+)*")
+
+
+def tokenize(text):
+    """Split text into (original word, normalized word) pairs; names and questions use the same rules"""
+    return [(word, normalize_name(word)) for word in _TOKEN.findall(text)]
+
+
+class CityMatcher:
+    """Word-level Aho-Corasick automaton over a city gazetteer.
+
+    ``find`` reports every city mention in a question in one left-to-right
+    pass, including multi-word names, and picks up a trailing country
+    qualifier ("Paris, France" or "Paris FR").
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]  # node -> ((length in words, name), ...) for every name ending here
+        self._best = {}  # normalized name -> (country, population) of its most populous entry
+        self._countries = set()
+        self._compiled = False
+
+    def __len__(self):
+        return len(self._best)
+
+    def add(self, name, country="", population=0):
+        words = tuple(normalized for _, normalized in tokenize(name))
+        if not words:
+            return
+        key = " ".join(words)
+        country = (country or "").upper()
+        if country:
+            self._countries.add(country)
+        best = self._best.get(key)
+        if best is not None:
+            if population <= best[1]:
+                return
+            self._best[key] = (country, population)
+            return
+        self._best[key] = (country, population)
+        node = 0
+        for word in words:
+            nxt = self._goto[node].get(word)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][word] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] = ((len(words), key),)
+        self._compiled = False
+
+    def compile(self):
+        """Fill in failure links (breadth first) and merge outputs along them"""
+        queue = list(self._goto[0].values())
+        for node in queue:
+            self._fail[node] = 0
+        for node in queue:
+            for word, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(word, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+        self._compiled = True
+        return self
+
+    def _scan(self, words):
+        """Yield (start, end, name) for every gazetteer name in the normalized word list"""
+        node = 0
+        for i, word in enumerate(words):
+            while node and word not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(word, 0)
+            for length, name in self._out[node]:
+                yield i + 1 - length, i + 1, name
+
+    def _plausible(self, tokens, start, end):
+        if end - start == 1:
+            word, normalized = tokens[start]
+            return word[:1].isupper() and normalized not in STOPWORDS
+        # Multi-word names: accept lowercase typing, but not a run of filler words
+        return any(tokens[i][1] not in STOPWORDS and tokens[i][1] not in CONNECTORS for i in range(start, end))
+
+    def _qualifier(self, tokens, end):
+        """Country code for a qualifier right after a name, and how many words it used"""
+        for length in (3, 2, 1):
+            phrase = " ".join(normalized for _, normalized in tokens[end:end + length])
+            if len(tokens) - end >= length and phrase in COUNTRY_NAMES:
+                return COUNTRY_NAMES[phrase], length
+        if end < len(tokens):
+            word = tokens[end][0]
+            # Bare ISO codes only when written in capitals, so "in"/"it" never become IN/IT
+            if len(word) == 2 and word.isupper() and word in self._countries:
+                return word, 1
+        return None, 0
+
+    def find(self, text):
+        """Return [(city as written, country code)] for each mention, left to right.
+
+        Overlapping candidates resolve leftmost-longest, so "New York" wins over
+        "York". The country is the qualifier when one follows the name, else
+        the country of the most populous city by that name.
+        """
+        if not self._compiled:
+            self.compile()
+        tokens = tokenize(text)
+        candidates = sorted(self._scan([normalized for _, normalized in tokens]), key=lambda c: (c[0], c[0] - c[1]))
+        found = []
+        taken = 0
+        for start, end, name in candidates:
+            if start < taken or not self._plausible(tokens, start, end):
+                continue
+            country, used = self._qualifier(tokens, end)
+            found.append((" ".join(word for word, _ in tokens[start:end]), country or self._best[name][0]))
+            taken = end + used
+        return found
+
+
+def preposition_guess(text):
+    """Fallback without a gazetteer: the capitalized words after in/at/for/of ("Rio de Janeiro")"""
+    tokens = tokenize(text)
+    for i, (_, normalized) in enumerate(tokens[:-1]):
+        if normalized not in PREPOSITIONS:
+            continue
+        words = []
+        for word, lowered in tokens[i + 1:]:
+            if word[:1].isupper():
+                words.append(word)
+            elif words and lowered in CONNECTORS:
+                words.append(word)
+            else:
+                break
+        while words and normalize_name(words[-1]) in CONNECTORS:
+            words.pop()
+        if words:
+            return " ".join(words)
+        # Keep the old behaviour for lowercase questions: the single word after the preposition
+        return tokens[i + 1][0]
+    return None
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher():
+    """Process-wide matcher compiled from the geocode index on first use"""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            matcher = CityMatcher()
+            for name, country, population in get_index().entries():
+                matcher.add(name, country, population)
+            _matcher = matcher.compile()
+        return _matcher
+
+
+async def extract_places_async(text, limit=3):
+    """extract_places for coroutines: a first call compiles the matcher in a worker thread, not on the loop"""
+    if _matcher is None:
+        await asyncio.to_thread(get_matcher)
+    return extract_places(text, limit)
+
+
+def extract_places(text, limit=3):
+    """Up to ``limit`` distinct (city, country) mentions; country is None when only guessed from wording"""
+    matcher = get_matcher()
+    places = list(dict.fromkeys(matcher.find(text))) if len(matcher) else []
+    if not places:
+        city = preposition_guess(text)
+        places = [(city, None)] if city else []
+    return places[:limit]
+
+
+if __name__ == "__main__":
+    question = " ".join(sys.argv[1:]) or "Compare the weather in New York and Rio de Janeiro, Brazil"
+    print(f"🔎 {question}")
+    for city, country in extract_places(question, limit=10):
+        print(f"   📍 {city}, {country or '?'}")
@@ -1,19 +1,26 @@
 import asyncio
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from dotenv import load_dotenv
-import os
+from lazy_clients import chat_client, shared
+from state_store import persist, resume
 
-load_dotenv()
 
-api_key = os.getenv("OPENAI_API_KEY")
-model_client = OpenAIChatCompletionClient(api_key=api_key, model="gpt-4o-mini")
-assistant = AssistantAgent(model_client=model_client, name="my_assistant")
+def make_agent(model_client=None):
+    from autogen_agentchat.agents import AssistantAgent
+    return AssistantAgent(model_client=model_client or chat_client("openai"), name="my_assistant")
 
+# Built on first use so importing this module stays cheap
+default_agent = shared(make_agent)
 
-async def main():
-    result = await assistant.run(task="tell me joke?")
+
+async def main(agent=None, session_id=None):
+    agent = agent or default_agent()
+    if session_id:
+        # Picks up the conversation from the session log instead of starting over
+        await resume(agent, session_id)
+    result = await agent.run(task="tell me joke?")
+    if session_id:
+        await persist(agent, session_id)
     print(result.messages[-1].content)
 
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
 
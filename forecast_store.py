@@ -0,0 +1,233 @@
+import operator
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+
+try:
+    import numpy as np
+except ImportError:  # the array-module path below gives the same answers, just without SIMD
+    np = None
+
+# Seconds a loaded forecast is served before the tools fetch it again
+FORECAST_TTL = float(os.getenv("FORECAST_TTL", "1800"))
+
+DAY = 86400
+NUMPY_MIN_ROWS = 256
+# column name -> array typecode; four bytes per float, one per humidity percentage
+COLUMNS = {"time": "q", "temp": "f", "humidity": "B", "wind": "f"}
+FIELDS = ("temp", "humidity", "wind")
+OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+
+def _date(day):
+    # day counts local days, so formatting it as UTC gives the local date
+    return datetime.fromtimestamp(day * DAY, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _iso(ts, offset):
+    return datetime.fromtimestamp(ts + offset, timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+class ForecastStore:
+    """Columnar in-memory store of 3-hourly forecasts for many places.
+
+    Every place's periods sit in one contiguous, time-sorted run of shared
+    ``array`` columns (about 17 bytes a period instead of a pyowm ``Weather``
+    object), so daily aggregates and threshold queries are reductions over
+    slices. With NumPy installed, cross-place queries and long spans run as
+    mask/``reduceat`` operations on zero-copy views of the same buffers. Replacing a place leaves its old rows
+    dead until ``compact()``, which runs on its own once dead rows outnumber
+    live ones.
+    """
+
+    def __init__(self, ttl=FORECAST_TTL):
+        self.ttl = ttl
+        self._columns = {name: array(code) for name, code in COLUMNS.items()}
+        self._places = {}  # place -> (start, end, utc offset, loaded at)
+        self._dead = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._places)
+
+    def __contains__(self, place):
+        return place in self._places
+
+    def age(self, place):
+        """Seconds since place was loaded, or None if it is not in the store"""
+        entry = self._places.get(place)
+        return None if entry is None else time.monotonic() - entry[3]
+
+    def fresh(self, place):
+        age = self.age(place)
+        return age is not None and age < self.ttl
+
+    def put(self, place, times, temps, humidity, wind, utc_offset=0):
+        """Store one place's periods, replacing any earlier forecast for it"""
+        rows = sorted(zip(times, temps, humidity, wind))
+        with self._lock:
+            old = self._places.pop(place, None)
+            if old is not None:
+                self._dead += old[1] - old[0]
+            start = len(self._columns["time"])
+            for name, values in zip(COLUMNS, zip(*rows)):
+                self._columns[name].extend(values)
+            self._places[place] = (start, start + len(rows), utc_offset, time.monotonic())
+            if self._dead > start + len(rows) - self._dead:
+                self._compact()
+
+    def put_owm(self, place, payload):
+        """Load an OpenWeatherMap /forecast payload in one pass over its periods"""
+        periods = payload["list"]
+        self.put(
+            place,
+            [p["dt"] for p in periods],
+            [p["main"]["temp"] for p in periods],
+            [p["main"]["humidity"] for p in periods],
+            [p["wind"]["speed"] for p in periods],
+            payload.get("city", {}).get("timezone", 0),
+        )
+
+    def _compact(self):
+        columns = {name: array(code) for name, code in COLUMNS.items()}
+        for place, (start, end, offset, loaded_at) in list(self._places.items()):
+            new_start = len(columns["time"])
+            for name, column in columns.items():
+                column.extend(self._columns[name][start:end])
+            self._places[place] = (new_start, new_start + end - start, offset, loaded_at)
+        self._columns = columns
+        self._dead = 0
+
+    def compact(self):
+        """Drop the rows of replaced forecasts"""
+        with self._lock:
+            self._compact()
+
+    def nbytes(self):
+        return sum(column.itemsize * len(column) for column in self._columns.values())
+
+    def _span(self, place):
+        entry = self._places.get(place)
+        if entry is None:
+            raise KeyError(f"No forecast loaded for {place}")
+        return entry
+
+    def daily(self, place, days=None):
+        """Per local calendar day: min/max/mean temperature, mean humidity and peak wind"""
+        with self._lock:
+            start, end, offset, _ = self._span(place)
+            if start == end:
+                return []
+            # One place is a few dozen rows: NumPy's per-call overhead only pays off on long spans
+            if np is not None and end - start > NUMPY_MIN_ROWS:
+                summary = self._daily_numpy(start, end, offset)
+            else:
+                summary = self._daily_array(start, end, offset)
+        return summary[:days] if days else summary
+
+    def _daily_numpy(self, start, end, offset):
+        times = np.frombuffer(self._columns["time"], dtype=np.int64)[start:end]
+        temp = np.frombuffer(self._columns["temp"], dtype=np.float32)[start:end]
+        humidity = np.frombuffer(self._columns["humidity"], dtype=np.uint8)[start:end]
+        wind = np.frombuffer(self._columns["wind"], dtype=np.float32)[start:end]
+        day = (times + offset) // DAY
+        edges = np.concatenate(([0], np.flatnonzero(np.diff(day)) + 1))
+        counts = np.diff(np.append(edges, len(day)))
+        columns = (
+            day[edges],
+            np.minimum.reduceat(temp, edges),
+            np.maximum.reduceat(temp, edges),
+            np.add.reduceat(temp, edges, dtype=np.float64) / counts,
+            np.add.reduceat(humidity, edges, dtype=np.float64) / counts,
+            np.maximum.reduceat(wind, edges),
+        )
+        return [_day_summary(*row) for row in zip(*(c.tolist() for c in columns))]
+
+    def _daily_array(self, start, end, offset):
+        times = self._columns["time"]
+        summary = []
+        lo = start
+        while lo < end:
+            day = (times[lo] + offset) // DAY
+            hi = bisect_left(times, (day + 1) * DAY - offset, lo, end)
+            temp = self._columns["temp"][lo:hi]
+            summary.append(
+                _day_summary(
+                    day,
+                    min(temp),
+                    max(temp),
+                    sum(temp) / len(temp),
+                    sum(self._columns["humidity"][lo:hi]) / len(temp),
+                    max(self._columns["wind"][lo:hi]),
+                )
+            )
+            lo = hi
+        return summary
+
+    def periods_where(self, place, field, op, value):
+        """Local times of the periods where ``field op value`` holds, e.g. ("temp", ">", 30)"""
+        compare = _compare(field, op)
+        with self._lock:
+            start, end, offset, _ = self._span(place)
+            times = self._columns["time"][start:end]
+            if np is not None:
+                values = np.frombuffer(self._columns[field], dtype=_dtype(field))[start:end]
+                hits = np.flatnonzero(compare(values, value)).tolist()
+            else:
+                hits = [i for i, v in enumerate(self._columns[field][start:end]) if compare(v, value)]
+        return [_iso(times[i], offset) for i in hits]
+
+    def places_where(self, field, op, value):
+        """{place: matching period count} across every loaded place, in one pass over the column"""
+        compare = _compare(field, op)
+        with self._lock:
+            if np is not None:
+                mask = compare(np.frombuffer(self._columns[field], dtype=_dtype(field)), value)
+                # Prefix sums skip dead rows between spans and cope with empty ones
+                seen = np.concatenate(([0], np.cumsum(mask)))
+                places = list(self._places)
+                spans = np.array([entry[:2] for entry in self._places.values()], dtype=np.int64).reshape(-1, 2)
+                counts = seen[spans[:, 1]] - seen[spans[:, 0]]
+                return {places[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+            column = self._columns[field]
+            result = {}
+            for place, (start, end, _, _) in self._places.items():
+                n = sum(1 for v in column[start:end] if compare(v, value))
+                if n:
+                    result[place] = n
+            return result
+
+    def stats(self):
+        with self._lock:
+            rows = len(self._columns["time"])
+            return {"places": len(self._places), "rows": rows, "dead_rows": self._dead, "bytes": self.nbytes()}
+
+
+def _compare(field, op):
+    if field not in FIELDS:
+        raise ValueError(f"Unknown forecast field {field!r}; expected one of {', '.join(FIELDS)}")
+    if op not in OPS:
+        raise ValueError(f"Unknown comparison {op!r}; expected one of {', '.join(OPS)}")
+    return OPS[op]
+
+
+def _dtype(field):
+    return {"time": np.int64, "temp": np.float32, "humidity": np.uint8, "wind": np.float32}[field]
+
+
+def _day_summary(day, temp_min, temp_max, temp_mean, humidity_mean, wind_max):
+    return {
+        "date": _date(day),
+        "temp_min": round(temp_min, 1),
+        "temp_max": round(temp_max, 1),
+        "temp_mean": round(temp_mean, 1),
+        "humidity_mean": round(humidity_mean),
+        "wind_max": round(wind_max, 1),
+    }
+
+
+# Shared store for the forecast tool
+forecast_store = ForecastStore()
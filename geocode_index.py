@@ -0,0 +1,258 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+import unicodedata
+
+INDEX_PATH = os.getenv("GEOCODE_INDEX_PATH", os.path.join("data", "cities.idx"))
+
+MAGIC = b"GEOIDX1\0"
+HEADER = struct.Struct("<8sI")
+# normalized name, ISO country code, lat, lon, population
+RECORD = struct.Struct("<40s2sffI")
+NAME_WIDTH = 40
+
+
+def normalize_name(name):
+    """Case- and diacritic-insensitive form of a place name"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+def country_code(country):
+    """Upper-case ISO 3166 alpha-2 code, or "" for anything else (a full name, non-ASCII text)"""
+    code = (country or "").strip().upper()
+    return code if len(code) == 2 and code.isascii() and code.isalpha() else ""
+
+
+def _encode_name(name):
+    return normalize_name(name).encode("utf-8")[:NAME_WIDTH]
+
+
+def _parse_gazetteer_line(line):
+    """Parse a GeoNames dump row or a simple ``name<TAB>country<TAB>lat<TAB>lon[<TAB>population]`` row"""
+    cols = line.rstrip("\n").split("\t")
+    if len(cols) >= 15:
+        # GeoNames: 1=name, 4=lat, 5=lon, 8=country code, 14=population
+        return cols[1], cols[8], float(cols[4]), float(cols[5]), int(cols[14] or 0)
+    if len(cols) >= 4:
+        population = int(cols[4]) if len(cols) > 4 and cols[4] else 0
+        return cols[0], cols[1], float(cols[2]), float(cols[3]), population
+    return None
+
+
+def build_index(gazetteer_path, index_path=INDEX_PATH):
+    """Build a sorted fixed-width index file from a gazetteer; returns the record count"""
+    rows = {}
+    with open(gazetteer_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            parsed = _parse_gazetteer_line(line)
+            if parsed is None:
+                continue
+            name, country, lat, lon, population = parsed
+            key = (_encode_name(name), country.upper().encode("ascii")[:2])
+            # Keep the most populous entry for duplicate (name, country) pairs
+            if key not in rows or population > rows[key][2]:
+                rows[key] = (lat, lon, population)
+
+    return _write_index(index_path, rows)
+
+
+def _write_index(index_path, rows):
+    directory = os.path.dirname(index_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(rows)))
+        for (name, country), (lat, lon, population) in sorted(rows.items()):
+            f.write(RECORD.pack(name, country, lat, lon, population))
+    os.replace(tmp_path, index_path)
+    return len(rows)
+
+
+class GeocodeIndex:
+    """Memory-mapped city -> (lat, lon) index with prefix lookup.
+
+    Cities resolved by the live geocoder are kept in memory and appended to a
+    ``.learned`` journal next to the index, which is loaded on startup and
+    folded into the main file by ``compact()``.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.journal_path = path + ".learned"
+        self._mm = None
+        self._count = 0
+        self._learned = {}
+        self._lock = threading.Lock()
+        self._open()
+        self._load_journal()
+
+    def _open(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER.size:
+            return
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            self._mm = None
+            raise ValueError(f"{self.path} is not a geocode index")
+        self._count = count
+
+    def _load_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                parsed = _parse_gazetteer_line(line)
+                if parsed:
+                    name, country, lat, lon, _ = parsed
+                    self._learned[(normalize_name(name), country_code(country))] = (lat, lon)
+
+    def __len__(self):
+        return self._count + len(self._learned)
+
+    def _record(self, i):
+        name, country, lat, lon, population = RECORD.unpack_from(self._mm, HEADER.size + i * RECORD.size)
+        # float32 storage: round away the representation noise
+        return name.rstrip(b"\0"), country.rstrip(b"\0").decode("ascii"), round(lat, 5), round(lon, 5), population
+
+    def _lower_bound(self, key):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, city, country=""):
+        """Return (lat, lon) for an exact city name, or None if unknown"""
+        name = normalize_name(city)
+        country = (country or "").strip().upper()
+        key = name.encode("utf-8")[:NAME_WIDTH]
+        best = None
+        # compact() swaps the mapping and clears _learned under the same lock
+        with self._lock:
+            learned = self._learned.get((name, country))
+            if learned is None and not country:
+                learned = next((v for (n, _), v in self._learned.items() if n == name), None)
+            if learned is not None:
+                return learned
+            if self._mm is None:
+                return None
+
+            i = self._lower_bound(key)
+            while i < self._count:
+                rec_name, rec_country, lat, lon, population = self._record(i)
+                if rec_name != key:
+                    break
+                if (not country or rec_country == country) and (best is None or population > best[2]):
+                    best = (lat, lon, population)
+                i += 1
+        return (best[0], best[1]) if best else None
+
+    def prefix(self, text, limit=10):
+        """Return up to ``limit`` (name, country, lat, lon) entries whose name starts with text"""
+        key = normalize_name(text).encode("utf-8")[:NAME_WIDTH]
+        prefix = normalize_name(text)
+        results = []
+        with self._lock:
+            if self._mm is not None:
+                i = self._lower_bound(key)
+                while i < self._count and len(results) < limit:
+                    rec_name, rec_country, lat, lon, _ = self._record(i)
+                    if not rec_name.startswith(key):
+                        break
+                    results.append((rec_name.decode("utf-8", "ignore"), rec_country, lat, lon))
+                    i += 1
+            for (name, country), (lat, lon) in self._learned.items():
+                if len(results) >= limit:
+                    break
+                if name.startswith(prefix):
+                    results.append((name, country, lat, lon))
+        return results
+
+    def entries(self):
+        """Yield (normalized name, country, population) for every indexed and learned city"""
+        # Read everything under the lock rather than holding it across yields
+        with self._lock:
+            records = [self._record(i) for i in range(self._count)]
+            learned = list(self._learned)
+        for name, country, _, _, population in records:
+            yield name.decode("utf-8", "ignore"), country, population
+        for name, country in learned:
+            yield name, country, 0
+
+    def learn(self, city, country, lat, lon):
+        """Record a live geocoder result so the next lookup is local (blocking: appends to the journal)"""
+        name = normalize_name(city)
+        # The index stores two ASCII bytes per country; anything else is kept as unknown
+        country = country_code(country)
+        with self._lock:
+            if (name, country) in self._learned:
+                return
+            self._learned[(name, country)] = (lat, lon)
+            directory = os.path.dirname(self.journal_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(f"{city}\t{country}\t{lat}\t{lon}\n")
+
+    def compact(self):
+        """Fold learned entries into the main index file and remap it"""
+        with self._lock:
+            rows = {}
+            for i in range(self._count):
+                name, country, lat, lon, population = self._record(i)
+                rows[(name, country.encode("ascii"))] = (lat, lon, population)
+            for (name, country), (lat, lon) in self._learned.items():
+                key = (name.encode("utf-8")[:NAME_WIDTH], country.encode("ascii")[:2])
+                rows.setdefault(key, (lat, lon, 0))
+            self._unmap()
+            _write_index(self.path, rows)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self._learned.clear()
+            self._open()
+
+    def close(self):
+        with self._lock:
+            self._unmap()
+
+    def _unmap(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+            self._count = 0
+
+
+_index = None
+
+
+def get_index():
+    """Return the process-wide index, mapping INDEX_PATH on first use"""
+    global _index
+    if _index is None:
+        _index = GeocodeIndex(INDEX_PATH)
+    return _index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "build":
+        target = sys.argv[3] if len(sys.argv) > 3 else INDEX_PATH
+        count = build_index(sys.argv[2], target)
+        print(f"✅ Wrote {count} cities to {target}")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "lookup":
+        for name, country, lat, lon in get_index().prefix(" ".join(sys.argv[2:])):
+            print(f"   📍 {name}, {country}: {lat:.4f}, {lon:.4f}")
+    else:
+        print("Usage: python geocode_index.py build <gazetteer.txt> [index_path]")
+        print("       python geocode_index.py lookup <city prefix>")
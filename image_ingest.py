@@ -0,0 +1,278 @@
+import asyncio
+import base64
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+import aiohttp
+from autogen_core import Image as AGImage
+
+from singleflight import AsyncSingleFlight
+from tool_executor import default_executor
+
+# Most 512px tiles an image may cost (85 + 170 tokens each at high detail)
+MAX_TILES = int(os.getenv("IMAGE_MAX_TILES", "4"))
+JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+MAX_DOWNLOAD_BYTES = int(os.getenv("IMAGE_MAX_DOWNLOAD_BYTES", str(20 * 1024 * 1024)))
+CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join("data", "image_cache"))
+CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+URL_TTL = float(os.getenv("IMAGE_URL_TTL", "3600"))
+
+TILE = 512
+
+
+def vision_size(width, height):
+    """Size the OpenAI vision encoder works at: fit in 2048x2048, then shortest side at most 768"""
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def vision_tokens(width, height):
+    """High-detail prompt tokens for an image of this size"""
+    width, height = vision_size(width, height)
+    return 85 + 170 * math.ceil(width / TILE) * math.ceil(height / TILE)
+
+
+def target_size(width, height, max_tiles=MAX_TILES):
+    """Largest size, no bigger than what the encoder would use anyway, that fits in max_tiles tiles"""
+    width, height = vision_size(width, height)
+    scale = max(
+        min(1.0, columns * TILE / width, (max_tiles // columns) * TILE / height)
+        for columns in range(1, max(1, max_tiles) + 1)
+    )
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def prepare_image(data, max_tiles=MAX_TILES, quality=JPEG_QUALITY):
+    """Decode, downscale and JPEG-encode image bytes; returns (pil image, encoded bytes, source size).
+
+    The encoded bytes are the source's own (JPEG or PNG) when it needs no
+    resize or rotation and is no bigger than the re-encoded JPEG.
+    """
+    from PIL import Image, ImageOps
+
+    image = Image.open(BytesIO(data))
+    source_format = image.format
+    # EXIF orientations 5-8 are rotated a quarter turn: size the target for the upright image
+    orientation = image.getexif().get(0x0112, 1)
+    rotated = orientation in (5, 6, 7, 8)
+    width, height = image.size
+    source_size = (height, width) if rotated else (width, height)
+    size = target_size(*source_size, max_tiles)
+    # JPEG can decode straight at 1/2, 1/4 or 1/8 scale, which skips most of the work for big photos
+    image.draft("RGB", (size[1], size[0]) if rotated else size)
+    # exif_transpose returns a copy even when there is nothing to do, so the tag decides
+    image = ImageOps.exif_transpose(image)
+    oriented = orientation != 1
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+    if image.size != size:
+        image = image.resize(size, Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    encoded = buffer.getvalue()
+    # Small images already within budget can be smaller as sent than re-encoded
+    # (not when EXIF orientation was applied: the source bytes still need the viewer to rotate them)
+    if image.size == source_size and not oriented and source_format in ("JPEG", "PNG") and len(data) <= len(encoded):
+        encoded = data
+    return image, encoded, source_size
+
+
+def _extension(encoded):
+    # prepare_image only ever produces JPEG or keeps a JPEG/PNG source
+    return ".png" if encoded.startswith(b"\x89PNG") else ".jpg"
+
+
+def _decode(encoded):
+    from PIL import Image
+
+    image = Image.open(BytesIO(encoded))
+    image.load()
+    return image
+
+
+class EncodedImage(AGImage):
+    """AutoGen image that sends its stored JPEG (or small source PNG) bytes instead of re-encoding a PNG on every request"""
+
+    def __init__(self, image, encoded):
+        super().__init__(image)
+        self.encoded = encoded
+        self._base64 = base64.b64encode(encoded).decode("ascii")
+
+    def to_base64(self):
+        return self._base64
+
+
+class ImageIngestor:
+    """Fetches images without blocking the loop and turns them into model-ready EncodedImages.
+
+    Decoding and resizing run in the shared tool executor's threads. Images
+    are cut down to ``max_tiles`` vision tiles and stored content-addressed:
+    sha256 of the source bytes plus the size/quality settings. The cache keeps
+    a byte-bounded LRU in memory, mirrored to ``cache_dir`` (when set) for the
+    next process. URLs map to source hashes for ``url_ttl`` seconds, so a
+    repeated URL skips the download.
+    """
+
+    def __init__(
+        self,
+        max_tiles=MAX_TILES,
+        quality=JPEG_QUALITY,
+        cache_dir=CACHE_DIR,
+        max_cache_bytes=CACHE_MAX_BYTES,
+        max_download_bytes=MAX_DOWNLOAD_BYTES,
+        url_ttl=URL_TTL,
+        timeout=30.0,
+    ):
+        self.max_tiles = max_tiles
+        self.quality = quality
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.max_download_bytes = max_download_bytes
+        self.url_ttl = url_ttl
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.flights = AsyncSingleFlight()
+        self._images = OrderedDict()  # variant key -> EncodedImage
+        self._cache_bytes = 0
+        self._urls = {}  # url -> (variant key, resolved at)
+        self._lock = threading.Lock()
+        self._session = None
+        self._loop = None
+        self.downloads = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def _get_session(self):
+        # Same rule as OpenWeatherMapClient: one pooled session per event loop
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+            self._loop = loop
+        return self._session
+
+    def _variant(self, source_hash):
+        return f"{source_hash}-t{self.max_tiles}-q{self.quality}"
+
+    def _remember(self, key, image):
+        cost = len(image.encoded) + image.image.width * image.image.height * 3
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                return
+            self._images[key] = image
+            self._cache_bytes += cost
+            while self._cache_bytes > self.max_cache_bytes and len(self._images) > 1:
+                _, old = self._images.popitem(last=False)
+                self._cache_bytes -= len(old.encoded) + old.image.width * old.image.height * 3
+
+    def _cached(self, key):
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self.memory_hits += 1
+            return image
+
+    def _disk_path(self, key, encoded=None):
+        """Cache file for key: named for the format of ``encoded``, or the existing one when None"""
+        if not self.cache_dir:
+            return None
+        if encoded is not None:
+            return os.path.join(self.cache_dir, key + _extension(encoded))
+        for extension in (".jpg", ".png"):
+            path = os.path.join(self.cache_dir, key + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    async def _load_or_prepare(self, key, data):
+        path = self._disk_path(key)
+        if path:
+            with open(path, "rb") as f:
+                encoded = f.read()
+            pil = await default_executor.run(_decode, encoded, name="image_decode")
+            self.disk_hits += 1
+        else:
+            pil, encoded, source_size = await default_executor.run(
+                prepare_image, data, self.max_tiles, self.quality, name="image_prepare"
+            )
+            self.tokens_before += vision_tokens(*source_size)
+            self.tokens_after += vision_tokens(*pil.size)
+            self.bytes_out += len(encoded)
+            path = self._disk_path(key, encoded)
+            if path:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(encoded)
+                os.replace(tmp_path, path)
+        image = EncodedImage(pil, encoded)
+        self._remember(key, image)
+        return image
+
+    async def from_bytes(self, data):
+        """EncodedImage for raw image bytes, prepared once per distinct content"""
+        key = self._variant(hashlib.sha256(data).hexdigest())
+        return self._cached(key) or await self.flights.do(key, self._load_or_prepare, key, data)
+
+    async def _download(self, url):
+        async with self._get_session().get(url) as response:
+            response.raise_for_status()
+            if (response.content_length or 0) > self.max_download_bytes:
+                raise ValueError(f"{url} is larger than {self.max_download_bytes} bytes")
+            data = await response.content.read(self.max_download_bytes + 1)
+            if len(data) > self.max_download_bytes:
+                raise ValueError(f"{url} is larger than {self.max_download_bytes} bytes")
+        self.downloads += 1
+        self.bytes_in += len(data)
+        image = await self.from_bytes(data)
+        with self._lock:
+            self._urls[url] = (self._variant(hashlib.sha256(data).hexdigest()), time.monotonic())
+        return image
+
+    async def from_url(self, url):
+        """EncodedImage for an image URL; concurrent and repeated requests for a URL share one download"""
+        with self._lock:
+            entry = self._urls.get(url)
+        if entry is not None and time.monotonic() - entry[1] < self.url_ttl:
+            image = self._cached(entry[0])
+            if image is not None:
+                return image
+        return await self.flights.do(("url", url), self._download, url)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached_images": len(self._images),
+                "cache_bytes": self._cache_bytes,
+                "downloads": self.downloads,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "vision_tokens_before": self.tokens_before,
+                "vision_tokens_after": self.tokens_after,
+            }
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+# Shared ingestor; its aiohttp session is opened on first use
+image_ingestor = ImageIngestor()
@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+ENTRY_POINTS = (
+    "firstAgent",
+    "agent_updated",
+    "agent_with_tools",
+    "simpleAssistant",
+    "simpleWeather",
+    "weatherAgent",
+    "messages_autogen",
+    "observing_agent",
+    "agent_server",
+)
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure(module, runs=3, python=sys.executable):
+    """Import module in fresh interpreters under ``-X importtime``.
+
+    Returns {imported name: (self us, cumulative us)}, keeping the fastest
+    of ``runs`` cold starts for each entry to damp scheduler noise.
+    """
+    best = {}
+    for _ in range(runs):
+        proc = subprocess.run(
+            [python, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            cwd=PROJECT_DIR,
+        )
+        if proc.returncode != 0:
+            errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+            raise RuntimeError(f"importing {module} failed: {errors[-1] if errors else proc.returncode}")
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            fields = line[len("import time:"):].split("|")
+            try:
+                self_us, cumulative_us = int(fields[0]), int(fields[1])
+            except ValueError:
+                continue  # column header
+            name = fields[2].strip()
+            if name not in best or cumulative_us < best[name][1]:
+                best[name] = (self_us, cumulative_us)
+    return best
+
+
+def summarize(module, timings, top=10):
+    """Group raw importtime entries into per-package self time and per-project-module cumulative time"""
+    packages = defaultdict(int)
+    for name, (self_us, _) in timings.items():
+        packages[name.split(".")[0]] += self_us
+    project = {
+        name: cumulative_us
+        for name, (_, cumulative_us) in timings.items()
+        if "." not in name and os.path.exists(os.path.join(PROJECT_DIR, f"{name}.py"))
+    }
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "module": module,
+        "total_ms": timings.get(module, (0, 0))[1] / 1000,
+        "modules_imported": len(timings),
+        "packages": [{"package": name, "self_ms": us / 1000} for name, us in ranked[:top]],
+        "project_modules": [
+            {"module": name, "cumulative_ms": us / 1000}
+            for name, us in sorted(project.items(), key=lambda item: item[1], reverse=True)
+        ],
+    }
+
+
+def print_summary(summary):
+    total = summary["total_ms"] or 1
+    print(f"\n⏱️  {summary['module']}: {summary['total_ms']:.1f} ms cold import, {summary['modules_imported']} modules")
+    print("=" * 60)
+    print(f"{'package':<36}{'self ms':>12}{'share':>10}")
+    for entry in summary["packages"]:
+        print(f"{entry['package']:<36}{entry['self_ms']:>12.1f}{entry['self_ms'] / total:>10.1%}")
+    print("-" * 60)
+    print(f"{'project module':<36}{'cumulative ms':>12}")
+    for entry in summary["project_modules"]:
+        print(f"{entry['module']:<36}{entry['cumulative_ms']:>12.1f}")
+    print("=" * 60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-package cold-start import time for the agent entry points")
+    parser.add_argument("modules", nargs="*", default=list(ENTRY_POINTS), help="modules to import (default: every entry point)")
+    parser.add_argument("--runs", type=int, default=3, help="cold starts per module; the fastest is kept")
+    parser.add_argument("--top", type=int, default=10, help="packages to list per module")
+    parser.add_argument("--json", dest="json_path", help="also write the summaries to this JSON file")
+    args = parser.parse_args(argv)
+
+    summaries = []
+    for module in args.modules:
+        try:
+            summary = summarize(module, measure(module, args.runs), args.top)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            continue
+        print_summary(summary)
+        summaries.append(summary)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, indent=2)
+        print(f"💾 Import report written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import functools
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OPENAI_MODEL = "gpt-4o-mini"
+OPENROUTER_MODEL = "deepseek/deepseek-chat-v3.1"
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+OPENROUTER_MODEL_INFO = {
+    "family": "deepseek",
+    "provider": "openrouter/openrouter",
+    "type": "chat",
+    "vision": True,
+    "function_calling": True,
+    "json_output": True,
+    "structured_output": True,
+    "context_length": 8192,
+    "max_tokens": 4096,
+    "supported_features": ["chat", "vision", "function_calling"]
+}
+# "on" lets agents use whichever of OpenAI/OpenRouter is answering faster (see chat_client)
+LLM_ROUTING = os.getenv("LLM_ROUTING", "off")
+
+
+def shared(factory):
+    """Decorator: build factory(*args, **kwargs) once per distinct arguments, on first call.
+
+    Construction is serialised, so concurrent first callers get the same object.
+    ``cache_clear()`` drops everything built so far.
+    """
+    built = {}
+    lock = threading.Lock()
+
+    @functools.wraps(factory)
+    def get(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        try:
+            return built[key]
+        except KeyError:
+            pass
+        with lock:
+            if key not in built:
+                built[key] = factory(*args, **kwargs)
+            return built[key]
+
+    get.cache_clear = built.clear
+    return get
+
+
+# The OpenAI extension is the slowest import in the project, so it is only loaded here
+@shared
+def openai_client(model=OPENAI_MODEL):
+    """Shared OpenAI chat-completion client (wrapped by the response cache when enabled)"""
+    from autogen_ext.models.openai import OpenAIChatCompletionClient
+    from llm_cache import cache_from_env
+
+    return cache_from_env(OpenAIChatCompletionClient(api_key=os.getenv("OPENAI_API_KEY"), model=model))
+
+
+@shared
+def openrouter_client(model=OPENROUTER_MODEL):
+    """Shared OpenRouter chat-completion client (wrapped by the response cache when enabled)"""
+    from autogen_ext.models.openai import OpenAIChatCompletionClient
+    from llm_cache import cache_from_env
+
+    return cache_from_env(
+        OpenAIChatCompletionClient(
+            api_key=os.getenv("OPENROUTER_API_KEY"),
+            model=model,
+            base_url=OPENROUTER_BASE_URL,
+            model_info=OPENROUTER_MODEL_INFO,
+        )
+    )
+
+
+@shared
+def chat_client(prefer="openai"):
+    """Model client for an agent: the preferred backend, or a latency-aware router over both.
+
+    With LLM_ROUTING=on and both API keys set, requests go to whichever
+    backend is currently fastest and healthy; ``prefer`` only breaks ties.
+    """
+    backends = {"openai": openai_client, "openrouter": openrouter_client}
+    keys = {"openai": "OPENAI_API_KEY", "openrouter": "OPENROUTER_API_KEY"}
+    if LLM_ROUTING != "on" or not all(os.getenv(key) for key in keys.values()):
+        return backends[prefer]()
+    from model_router import RoutedChatCompletionClient
+
+    order = [prefer] + [name for name in backends if name != prefer]
+    return RoutedChatCompletionClient({name: backends[name]() for name in order})
+
+
+@shared
+def weather_manager(api_key=None):
+    """Shared pyowm weather manager routed through the request scheduler"""
+    from pyowm import OWM
+    from owm_scheduler import scheduled
+
+    return scheduled(OWM(api_key or os.getenv("OPENWEATHERMAP_API_KEY")).weather_manager())
+
+
+class LazyWeatherManager:
+    """Placeholder for the shared weather manager that builds it on first use"""
+
+    def __init__(self, api_key=None):
+        self._api_key = api_key
+
+    def __getattr__(self, name):
+        return getattr(weather_manager(self._api_key), name)
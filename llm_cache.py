@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncGenerator, Literal, Mapping, Optional, Sequence, Union
+
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage, ModelCapabilities, ModelInfo, RequestUsage
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+
+CACHE_MODES = ("off", "readwrite", "record", "replay")
+CACHE_MODE = os.getenv("LLM_CACHE_MODE", "off")
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("data", "llm_cache.sqlite3"))
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a request has not been recorded"""
+
+
+class ResponseStore:
+    """SQLite-backed response store with least-recently-used eviction by total payload size"""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+            " size INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._db.commit()
+        self.total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        """Return (kind, payload) for key, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT kind, payload FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._db.commit()
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def put(self, key, kind, payload):
+        data = json.dumps(payload)
+        size = len(data.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, kind, payload, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, data, size, now, now),
+            )
+            self.total_bytes += size - (old[0] if old else 0)
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            row = self._db.execute("SELECT key, size FROM responses ORDER BY last_used LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self.total_bytes -= row[1]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def request_key(model, messages, tools, tool_choice, json_output, extra_create_args):
+    """Stable hash of everything that can change a completion"""
+    if isinstance(json_output, type) and issubclass(json_output, BaseModel):
+        json_output = json_output.model_json_schema()
+    request = {
+        "model": model,
+        "messages": [message.model_dump(mode="json") for message in messages],
+        "tools": [tool.schema if isinstance(tool, Tool) else tool for tool in tools],
+        "tool_choice": tool_choice.name if isinstance(tool_choice, Tool) else tool_choice,
+        "json_output": json_output,
+        "extra_create_args": dict(extra_create_args),
+    }
+    serialized = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class CachedChatCompletionClient(ChatCompletionClient):
+    """Record/replay wrapper around any ChatCompletionClient.
+
+    Modes: ``readwrite`` serves repeats from the store and records misses,
+    ``record`` always calls the model and overwrites, ``replay`` never calls
+    the model and raises CacheMissError for unrecorded requests.
+    """
+
+    def __init__(self, client, store=None, mode="readwrite", model=None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {CACHE_MODES}")
+        self.client = client
+        self.store = store or ResponseStore()
+        self.mode = mode
+        # OpenAIChatCompletionClient keeps the model name in its create args
+        self.model = model or getattr(client, "_create_args", {}).get("model", "")
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key):
+        if self.mode in ("readwrite", "replay"):
+            entry = self.store.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+        self.misses += 1
+        if self.mode == "replay":
+            raise CacheMissError(f"No recorded response for request {key[:12]} (LLM_CACHE_MODE=replay)")
+        return None
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        key = request_key(self.model, messages, tools, tool_choice, json_output, extra_create_args)
+        entry = self._lookup(key)
+        if entry is not None:
+            kind, payload = entry
+            result = CreateResult.model_validate(payload if kind == "create" else payload[-1])
+            result.cached = True
+            return result
+
+        result = await self.client.create(
+            messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        )
+        self.store.put(key, "create", result.model_dump(mode="json"))
+        return result
+
+    def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        async def _generator() -> AsyncGenerator[Union[str, CreateResult], None]:
+            key = request_key(self.model, messages, tools, tool_choice, json_output, extra_create_args)
+            entry = self._lookup(key)
+            if entry is not None:
+                kind, payload = entry
+                if kind == "create":
+                    # Recorded without streaming: replay the text as one chunk
+                    payload = ([payload["content"]] if isinstance(payload["content"], str) else []) + [payload]
+                for item in payload[:-1]:
+                    yield item
+                result = CreateResult.model_validate(payload[-1])
+                result.cached = True
+                yield result
+                return
+
+            recorded = []
+            async for item in self.client.create_stream(
+                messages,
+                tools=tools,
+                tool_choice=tool_choice,
+                json_output=json_output,
+                extra_create_args=extra_create_args,
+                cancellation_token=cancellation_token,
+            ):
+                recorded.append(item.model_dump(mode="json") if isinstance(item, CreateResult) else item)
+                yield item
+            self.store.put(key, "stream", recorded)
+
+        return _generator()
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    def actual_usage(self) -> RequestUsage:
+        return self.client.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self.client.total_usage()
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self.client.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self.client.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore
+        return self.client.capabilities
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self.client.model_info
+
+
+_store = None
+
+
+def cache_from_env(client):
+    """Wrap client according to LLM_CACHE_MODE; returns it unchanged when the mode is "off" """
+    global _store
+    if CACHE_MODE == "off":
+        return client
+    if _store is None:
+        _store = ResponseStore(CACHE_PATH, CACHE_MAX_BYTES)
+    return CachedChatCompletionClient(client, _store, mode=CACHE_MODE)
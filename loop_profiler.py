@@ -0,0 +1,249 @@
+import asyncio
+import contextlib
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# off | stalls | sample | cprofile; every mode except "off" runs the stall detector
+PROFILE_MODE = os.getenv("LOOP_PROFILE", "off")
+STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", "0.1"))
+SAMPLE_INTERVAL = float(os.getenv("LOOP_SAMPLE_INTERVAL", "0.005"))
+PROFILE_DIR = os.getenv("LOOP_PROFILE_DIR", os.path.join("data", "profiles"))
+MODES = ("off", "stalls", "sample", "cprofile")
+
+
+def known_tools():
+    """Names of the agent tools run through the shared executor so far, plus every wrapped one"""
+    from tool_executor import default_executor
+
+    return default_executor.tool_names | set(default_executor.stats)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})".replace(";", ":")
+
+
+def fold(frame, *roots, tools=()):
+    """One collapsed-stack line ("root;outer;...;inner") for flamegraph.pl / speedscope / inferno.
+
+    When a frame belongs to one of ``tools`` the stack is tagged
+    "tool:<name>" right under the roots, so the flame graph groups by tool.
+    """
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    tool = next((f.f_code.co_name for f in frames if f.f_code.co_name in tools), None)
+    names = list(roots) + ([f"tool:{tool}"] if tool else []) + [_frame_name(f) for f in frames]
+    return ";".join(names)
+
+
+def write_folded(path, stacks):
+    """Write {folded stack: samples} in collapsed-stack format"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+class StallDetector:
+    """Watches one event loop for callbacks that hold it longer than ``threshold``.
+
+    A heartbeat task on the loop ticks every ``interval`` and records how
+    late each tick ran. A watchdog thread checks the last tick; while the loop
+    is overdue it samples the loop thread's stack every ``interval``. The
+    samples are kept as folded stacks (written to ``path`` after each stall)
+    whose weight is proportional to how long the code blocked the loop.
+    """
+
+    def __init__(self, threshold=STALL_THRESHOLD, interval=None, path=None):
+        from agent_metrics import RollingHistogram
+
+        self.threshold = threshold
+        self.interval = interval or max(0.005, threshold / 4)
+        self.path = path or os.path.join(PROFILE_DIR, "stalls.folded")
+        self.lag = RollingHistogram(1024)
+        self.stacks = Counter()
+        self.stalls = 0
+        self.worst = 0.0
+        self.loop = None
+        self._beat = None
+        self._thread_id = None
+        self._task = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self, loop=None):
+        """Start watching the running loop (or ``loop``); returns self"""
+        self.loop = loop or asyncio.get_running_loop()
+        self._thread_id = threading.get_ident() if loop is None else None
+        self._beat = time.perf_counter()
+        self._task = self.loop.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="stall-watchdog", daemon=True).start()
+        return self
+
+    async def _heartbeat(self):
+        self._thread_id = threading.get_ident()
+        try:
+            while True:
+                self._beat = time.perf_counter()
+                await asyncio.sleep(self.interval)
+                self.lag.observe(max(0.0, time.perf_counter() - self._beat - self.interval))
+        finally:
+            # Cancelled by stop() or by the loop shutting down (asyncio.run cancels leftover tasks):
+            # without a heartbeat the watchdog would report the idle thread as one long stall
+            self._stop.set()
+            if _detectors.get(self.loop) is self:
+                del _detectors[self.loop]
+
+    def _watch(self):
+        stalled_at = None
+        tools = ()
+        while not self._stop.wait(self.interval):
+            overdue = time.perf_counter() - self._beat - self.interval
+            if overdue < self.threshold:
+                if stalled_at is not None:
+                    self._end_stall(stalled_at)
+                    stalled_at = None
+                continue
+            if stalled_at is None:
+                stalled_at = self._beat + self.interval
+                tools = known_tools()
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                with self._lock:
+                    self.stacks[fold(frame, "loop-stall", tools=tools)] += 1
+
+    def _end_stall(self, stalled_at):
+        duration = time.perf_counter() - stalled_at
+        with self._lock:
+            self.stalls += 1
+            self.worst = max(self.worst, duration)
+            stacks = Counter(self.stacks)
+        print(f"🐢 Event loop blocked for {duration * 1000:.0f} ms; stacks in {self.path}", file=sys.stderr)
+        write_folded(self.path, stacks)
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "stalls": self.stalls,
+                "worst_seconds": self.worst,
+                "lag_p50": self.lag.percentile(0.5),
+                "lag_p99": self.lag.percentile(0.99),
+                "samples": sum(self.stacks.values()),
+            }
+
+
+class _Sampler:
+    """Samples the loop thread and the tool worker threads at a fixed interval during one turn"""
+
+    def __init__(self, label, loop_thread, interval=SAMPLE_INTERVAL):
+        self.label = label
+        self.loop_thread = loop_thread
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="turn-sampler", daemon=True)
+
+    def _run(self):
+        tools = known_tools()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.loop_thread:
+                    name = "loop"
+                else:
+                    if thread_id not in names:
+                        thread = next((t for t in threading.enumerate() if t.ident == thread_id), None)
+                        names[thread_id] = thread.name if thread else ""
+                    name = names[thread_id]
+                    # Only busy threads doing agent work: tool executor workers and asyncio's default executor
+                    if not name.startswith(("tool", "asyncio")) or frame.f_code.co_name == "_worker":
+                        continue
+                self.stacks[fold(frame, f"turn:{self.label}", name, tools=tools)] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+_detectors = {}  # loop -> StallDetector
+_cprofile_lock = threading.Lock()  # one cProfile at a time: overlapping turns would share a profiler
+skipped_profiles = 0
+
+
+def stall_detector(loop=None):
+    """The running loop's stall detector, started on first use"""
+    loop = loop or asyncio.get_running_loop()
+    detector = _detectors.get(loop)
+    if detector is None or detector.loop is not loop or detector._stop.is_set():
+        detector = _detectors[loop] = StallDetector().start()
+    return detector
+
+
+def loop_stats():
+    """Stall counters for the running loop, or None when nothing watches it"""
+    detector = _detectors.get(asyncio.get_running_loop())
+    return detector.stats() if detector is not None else None
+
+
+def _safe_label(label):
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in label)[:60] or "turn"
+
+
+@contextlib.asynccontextmanager
+async def profile_turn(label, mode=None):
+    """Instrument one agent turn according to LOOP_PROFILE (a no-op when it is "off").
+
+    "stalls" only makes sure the stall detector watches this loop; "sample"
+    also writes ``<label>-<time>.folded`` with loop and tool-thread stacks for
+    the turn; "cprofile" writes a ``.prof`` file for pstats/snakeviz instead.
+    """
+    global skipped_profiles
+    mode = mode or PROFILE_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown LOOP_PROFILE {mode!r}; expected one of {MODES}")
+    if mode == "off":
+        yield
+        return
+    stall_detector()
+    path = os.path.join(PROFILE_DIR, f"{_safe_label(label)}-{time.strftime('%Y%m%d-%H%M%S')}")
+    if mode == "sample":
+        with _Sampler(label, threading.get_ident()) as sampler:
+            yield
+        print(f"🔥 Turn profile: {write_folded(path + '.folded', sampler.stacks)}", file=sys.stderr)
+    elif mode == "cprofile" and _cprofile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(path + ".prof")
+            print(f"🔥 Turn profile: {path}.prof", file=sys.stderr)
+        finally:
+            _cprofile_lock.release()
+    else:
+        skipped_profiles += mode == "cprofile"
+        yield
@@ -1,39 +1,38 @@
 import asyncio
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from autogen_agentchat.messages import TextMessage, MultiModalMessage
-from autogen_core import Image as AGImage
-from PIL import Image
-from io import BytesIO
-import requests
-
-from dotenv import load_dotenv
-import os
-import uuid
-from datetime import datetime, timezone
-
-load_dotenv()
-
-api_key = os.getenv("OPENAI_API_KEY")
-model_client = OpenAIChatCompletionClient(api_key=api_key, model="gpt-4o-mini")
-
-assistant = AssistantAgent(
-    model_client=model_client, 
-    name="my_assistant", 
-    system_message="You are a helpful assistant that can answer questions and help with tasks.")
-
-async def text_task():
+from lazy_clients import chat_client, shared
+
+def make_agent(model_client=None):
+    from autogen_agentchat.agents import AssistantAgent
+    return AssistantAgent(
+        model_client=model_client or chat_client("openai"), 
+        name="my_assistant", 
+        system_message="You are a helpful assistant that can answer questions and help with tasks.")
+
+# Built on first use so importing this module stays cheap
+default_agent = shared(make_agent)
+
+IMAGE_URL = "https://picsum.photos/id/237/200/300"
+
+async def text_task(agent=None):
+    from autogen_agentchat.messages import TextMessage
+
+    agent = agent or default_agent()
     text_message = TextMessage(content="get me the weather in Chennai?", source="user")
-    result = await assistant.run(task=text_message)
+    result = await agent.run(task=text_message)
     print(result.messages[-1].content)
 
-async def image_task():
-    response = requests.get("https://picsum.photos/id/237/200/300")
-    image = Image.open(BytesIO(response.content))
-    ag_image = AGImage(image)
+async def image_task(agent=None, url=IMAGE_URL):
+    # Only the image path needs PIL and aiohttp
+    from autogen_agentchat.messages import MultiModalMessage
+    from image_ingest import image_ingestor
+
+    agent = agent or default_agent()
+    # Non-blocking download, decode/downscale in a worker thread, cached by content
+    ag_image = await image_ingestor.from_url(url)
 
     multimodal_message = MultiModalMessage(content=["What is in this image?", ag_image], source="user")
-    result = await assistant.run(task=multimodal_message)
+    result = await agent.run(task=multimodal_message)
     print(result.messages[-1].content)
 
-asyncio.run(image_task())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(image_task())
@@ -0,0 +1,298 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Literal, Mapping, Optional, Sequence, Union
+
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage, ModelCapabilities, ModelInfo, RequestUsage
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+
+from agent_metrics import RollingHistogram
+
+# Per-attempt deadline; a backend that misses it is failed over like a 5xx
+ATTEMPT_TIMEOUT = float(os.getenv("LLM_ROUTER_TIMEOUT", "60"))
+HEDGE_QUANTILE = float(os.getenv("LLM_ROUTER_HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_ROUTER_HEDGE_MIN_SAMPLES", "20"))
+# A backend failing more than this share of its recent calls is skipped until its cooldown ends
+MAX_ERROR_RATE = float(os.getenv("LLM_ROUTER_MAX_ERROR_RATE", "0.5"))
+COOLDOWN = float(os.getenv("LLM_ROUTER_COOLDOWN", "30"))
+
+
+def retryable(error):
+    """Whether another backend might succeed: timeouts, connection errors, 429 and 5xx"""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, (openai.APITimeoutError, openai.APIConnectionError))
+
+
+class BackendHealth:
+    """Rolling latency and error history for one model backend.
+
+    ``create`` latency is the full completion; ``stream`` latency is time to
+    the first streamed item, which is what routing a stream should optimize.
+    """
+
+    def __init__(self, window=256, outcomes=50):
+        self.latency = {"create": RollingHistogram(window), "stream": RollingHistogram(window)}
+        self._outcomes = deque(maxlen=outcomes)  # True for success
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.wins = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def record(self, kind, seconds=None, ok=True):
+        with self._lock:
+            self.calls += 1
+            self._outcomes.append(ok)
+            if ok:
+                self.latency[kind].observe(seconds)
+                return
+            self.errors += 1
+            # A few samples first, so one transient 503 does not bench a backend
+            if len(self._outcomes) >= 5 and self.error_rate() > MAX_ERROR_RATE:
+                self.cooldown_until = time.monotonic() + COOLDOWN
+
+    def error_rate(self):
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    def healthy(self):
+        return time.monotonic() >= self.cooldown_until
+
+    def expected(self, kind):
+        """Median latency, inflated by the error rate; unknown backends score 0 so they get tried"""
+        median = self.latency[kind].percentile(0.5)
+        return (median or 0.0) / max(0.05, 1.0 - self.error_rate())
+
+    def hedge_after(self, kind):
+        if self.latency[kind].count < HEDGE_MIN_SAMPLES:
+            return None
+        return self.latency[kind].percentile(HEDGE_QUANTILE)
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": self.error_rate(),
+            "healthy": self.healthy(),
+            "wins": self.wins,
+            "hedges": self.hedges,
+            "p50": self.latency["create"].percentile(0.5),
+            "p95": self.latency["create"].percentile(0.95),
+            "stream_p50": self.latency["stream"].percentile(0.5),
+        }
+
+
+# Health is per backend name, so every router over the same backends learns from every call
+_health = {}
+_health_lock = threading.Lock()
+
+
+def backend_health(name):
+    with _health_lock:
+        if name not in _health:
+            _health[name] = BackendHealth()
+        return _health[name]
+
+
+class RoutedChatCompletionClient(ChatCompletionClient):
+    """Sends each request to the fastest healthy backend, hedging and failing over to the others.
+
+    ``backends`` maps a name to a ChatCompletionClient, in order of preference
+    for ties (e.g. before any latency is known). A request that outlives its
+    backend's p95 gets a duplicate on the next backend, and the first answer
+    wins. A timeout, connection error, 429 or 5xx moves the request on to the
+    next backend at once; other errors (bad requests) are raised as-is. A
+    stream commits to whichever backend yields its first item first.
+    """
+
+    def __init__(self, backends, health=None, timeout=ATTEMPT_TIMEOUT):
+        if not backends:
+            raise ValueError("RoutedChatCompletionClient needs at least one backend")
+        self.backends = dict(backends)
+        self.health = health or {name: backend_health(name) for name in self.backends}
+        self.timeout = timeout
+
+    def _ranked(self, kind):
+        """Backend names, best first: healthy before cooling down, then by expected latency"""
+        order = list(self.backends)
+        return sorted(
+            order, key=lambda name: (not self.health[name].healthy(), self.health[name].expected(kind), order.index(name))
+        )
+
+    async def _race(self, kind, start):
+        """Run start(name) on the best backend, hedging/failing over down the ranking.
+
+        ``start`` returns an awaitable for one attempt. Returns (name, result)
+        for the first attempt that succeeds.
+        """
+        candidates = deque(self._ranked(kind))
+        running = {}  # task -> (backend name, started)
+        error = None
+
+        def launch():
+            name = candidates.popleft()
+            task = asyncio.ensure_future(asyncio.wait_for(start(name), self.timeout))
+            running[task] = (name, time.perf_counter())
+            return name
+
+        first = launch()
+        hedge_after = self.health[first].hedge_after(kind)
+        try:
+            while running:
+                timeout = hedge_after if candidates and hedge_after is not None else None
+                done, _ = await asyncio.wait(list(running), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Primary is past its p95: hedge once on the next backend
+                    self.health[launch()].hedges += 1
+                    hedge_after = None
+                    continue
+                for task in done:
+                    name, started = running.pop(task)
+                    health = self.health[name]
+                    if task.exception() is None:
+                        health.record(kind, time.perf_counter() - started)
+                        health.wins += 1
+                        return name, task.result()
+                    health.record(kind, ok=False)
+                    error = task.exception()
+                    if not retryable(error):
+                        # Another attempt (the primary or the hedge) may still succeed
+                        if not running:
+                            raise error
+                        continue
+                    if candidates:
+                        launch()
+            raise error
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        def start(name):
+            return self.backends[name].create(
+                messages, tools=tools, tool_choice=tool_choice, json_output=json_output, extra_create_args=extra_create_args
+            )
+
+        race = asyncio.ensure_future(self._race("create", start))
+        if cancellation_token is not None:
+            cancellation_token.link_future(race)
+        _, result = await race
+        return result
+
+    def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        streams = {}
+
+        async def start(name):
+            # The token stays linked past the first item, so cancelling the turn stops the upstream stream
+            stream = self.backends[name].create_stream(
+                messages,
+                tools=tools,
+                tool_choice=tool_choice,
+                json_output=json_output,
+                extra_create_args=extra_create_args,
+                cancellation_token=cancellation_token,
+            )
+            streams[name] = stream
+            return await stream.__anext__()
+
+        async def _generator() -> AsyncGenerator[Union[str, CreateResult], None]:
+            race = asyncio.ensure_future(self._race("stream", start))
+            if cancellation_token is not None:
+                cancellation_token.link_future(race)
+            try:
+                winner, first = await race
+            except BaseException:
+                race.cancel()
+                for stream in streams.values():
+                    await _close(stream)
+                raise
+            for name, stream in streams.items():
+                if name != winner:
+                    await _close(stream)
+            yield first
+            # Past the first item there is no switching backends: errors reach the caller
+            async for item in streams[winner]:
+                yield item
+
+        return _generator()
+
+    def _primary(self):
+        return self.backends[self._ranked("create")[0]]
+
+    async def close(self) -> None:
+        await asyncio.gather(*(client.close() for client in self.backends.values()))
+
+    def actual_usage(self) -> RequestUsage:
+        return _sum_usage(client.actual_usage() for client in self.backends.values())
+
+    def total_usage(self) -> RequestUsage:
+        return _sum_usage(client.total_usage() for client in self.backends.values())
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._primary().count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        # The tightest context window decides, since any backend may get the request
+        return min(client.remaining_tokens(messages, tools=tools) for client in self.backends.values())
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore
+        return self.model_info
+
+    @property
+    def model_info(self) -> ModelInfo:
+        """A feature is only advertised when every backend has it"""
+        infos = [client.model_info for client in self.backends.values()]
+        info = dict(infos[0])
+        for key in ("vision", "function_calling", "json_output", "structured_output"):
+            info[key] = all(other.get(key, False) for other in infos)
+        return info
+
+    def stats(self):
+        return {name: self.health[name].as_dict() for name in self.backends}
+
+
+async def _close(stream):
+    try:
+        await stream.aclose()
+    except Exception:
+        # A cancelled loser may still be mid-step; cancellation finishes it instead
+        pass
+
+
+def _sum_usage(usages):
+    prompt = completion = 0
+    for usage in usages:
+        prompt += usage.prompt_tokens
+        completion += usage.completion_tokens
+    return RequestUsage(prompt_tokens=prompt, completion_tokens=completion)
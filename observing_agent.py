@@ -1,69 +1,72 @@
 import asyncio
 import time
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from lazy_clients import chat_client, shared
 from autogen_agentchat.messages import TextMessage
 from autogen_core import CancellationToken
 from autogen_agentchat.ui import Console
+from stream_tee import tee_stream
+from agent_metrics import metrics
 
-from dotenv import load_dotenv
 import os
 import uuid
 from datetime import datetime, timezone
 
-load_dotenv()
-
-api_key = os.getenv("OPENAI_API_KEY")
-model_client = OpenAIChatCompletionClient(api_key=api_key, model="gpt-4o-mini")
-
 async def get_weather(city: str) -> str:
     return f"The weather in {city} is sunny"
 
-assistant = AssistantAgent(
-    model_client=model_client, 
-    name="my_assistant", 
-    tools=[get_weather],
-    system_message="You are a helpful assistant that can answer questions and help with tasks.")
+def make_agent(model_client=None):
+    from autogen_agentchat.agents import AssistantAgent
+    return AssistantAgent(
+        model_client=model_client or chat_client("openai"), 
+        name="my_assistant", 
+        tools=[get_weather],
+        system_message="You are a helpful assistant that can answer questions and help with tasks.")
 
-def print_statistics(start_time, end_time, events, response_type):
-    """Print comprehensive statistics"""
-    duration = end_time - start_time
-    
+# Built on first use so importing this module stays cheap
+default_agent = shared(make_agent)
+
+def print_statistics(run, response_type):
+    """Print the latency and token statistics recorded for one run"""
     print(f"\n📊 {response_type} Statistics:")
     print("=" * 50)
-    print(f"⏱️  Total Time: {duration:.3f} seconds")
-    
-    # Count different event types
-    event_counts = {}
-    total_tokens = 0
-    
-    for event in events:
-        event_type = type(event).__name__
-        event_counts[event_type] = event_counts.get(event_type, 0) + 1
-        
-        # Extract token usage if available
-        if hasattr(event, 'models_usage') and event.models_usage:
-            if hasattr(event.models_usage, 'prompt_tokens'):
-                total_tokens += event.models_usage.prompt_tokens or 0
-            if hasattr(event.models_usage, 'completion_tokens'):
-                total_tokens += event.models_usage.completion_tokens or 0
-    
-    print(f"🔢 Total Events: {len(events)}")
+    print(f"⏱️  Total Time: {run.duration:.3f} seconds")
+    if run.time_to_first_event is not None:
+        print(f"🚦 Time to First Event: {run.time_to_first_event:.3f}s")
+    if run.time_to_first_token is not None:
+        print(f"🔤 Time to First Token: {run.time_to_first_token:.3f}s")
+    
+    total_events = sum(run.event_counts.values())
+    print(f"🔢 Total Events: {total_events}")
     print(f"🧮 Event Breakdown:")
-    for event_type, count in event_counts.items():
+    for event_type, count in run.event_counts.items():
         print(f"   - {event_type}: {count}")
     
-    print(f"🔤 Total Tokens: {total_tokens}")
-    print(f"⚡ Average Time per Event: {duration/len(events):.3f}s" if events else "N/A")
+    for tool, seconds in run.tool_durations:
+        print(f"🛠️  Tool {tool}: {seconds:.3f}s")
+    
+    print(f"🔤 Tokens: {run.prompt_tokens} prompt + {run.completion_tokens} completion")
     print("=" * 50)
 
+def print_latency_summary():
+    """Print rolling percentiles across every run recorded so far"""
+    print(f"\n📈 Latency Percentiles over {metrics.runs} runs:")
+    print("=" * 60)
+    for name, series in metrics.snapshot()["metrics"].items():
+        for entry in series:
+            if entry["p50"] is None:
+                continue
+            labels = ", ".join(f"{k}={v}" for k, v in entry["labels"].items())
+            label_text = f" ({labels})" if labels else ""
+            print(f"   {name}{label_text}: p50={entry['p50']:.3f} p95={entry['p95']:.3f} p99={entry['p99']:.3f}")
+    print("=" * 60)
+
 async def assistant_task():
     """Test basic message handling with statistics"""
     print("📝 Testing Basic Message Handling...")
     
-    start_time = time.time()
+    run = metrics.start_run()
     
-    response = await assistant.on_messages(
+    response = await default_agent().on_messages(
         messages=[TextMessage(
             id=str(uuid.uuid4()),
             content="get me the weather in Chennai?",
@@ -76,7 +79,12 @@ async def assistant_task():
         cancellation_token=CancellationToken()
     )
     
-    end_time = time.time()
+    # Nothing is streamed here, so every message arrives when the call returns: count them
+    # and their tokens, but only the run's total time is a real latency
+    for message in response.inner_messages:
+        run.observe(message, replayed=True)
+    run.observe(response, replayed=True)
+    run.finish()
     
     print("Response inner messages:")
     print(response.inner_messages)
@@ -85,7 +93,7 @@ async def assistant_task():
     print(response.chat_message)
     
     # Print statistics
-    print_statistics(start_time, end_time, response.inner_messages, "Basic Message Handling")
+    print_statistics(run, "Basic Message Handling")
 
 async def assistant_task_with_streaming():
     """Test streaming message handling with Console and statistics"""
@@ -102,38 +110,27 @@ async def assistant_task_with_streaming():
         metadata={}
     )
     
-    start_time = time.time()
-    events = []
-    
-    # Custom event collector for streaming
-    async def collect_events():
-        nonlocal events
-        stream = assistant.on_messages_stream(
-            messages=[text_message],
-            cancellation_token=CancellationToken()
-        )
+    # Custom event printer for streaming
+    async def show_events(stream):
         async for event in stream:
-            events.append(event)
             # Still show real-time events
             print(f"🔄 Event: {type(event).__name__}")
             if hasattr(event, 'content'):
                 print(f"   Content: {event.content}")
     
-    # Use Console without unsupported parameters
-    await Console(
-        assistant.on_messages_stream(
+    # Run the agent once and feed the same events to Console, the printer and the metrics
+    _, _, run = await tee_stream(
+        default_agent().on_messages_stream(
             messages=[text_message],
             cancellation_token=CancellationToken()
-        )
+        ),
+        Console,
+        show_events,
+        metrics.observe_stream,
     )
     
-    # Collect events separately for statistics
-    await collect_events()
-    
-    end_time = time.time()
-    
     # Print streaming statistics
-    print_statistics(start_time, end_time, events, "Streaming Message Handling")
+    print_statistics(run, "Streaming Message Handling")
 
 async def detailed_streaming_analysis():
     """Detailed analysis of streaming with token tracking"""
@@ -153,12 +150,7 @@ async def detailed_streaming_analysis():
     events = []
     token_usage = {"prompt": 0, "completion": 0}
     
-    async def detailed_collector():
-        nonlocal events, token_usage
-        stream = assistant.on_messages_stream(
-            messages=[text_message],
-            cancellation_token=CancellationToken()
-        )
+    async def detailed_collector(stream):
         async for event in stream:
             events.append(event)
             
@@ -179,16 +171,17 @@ async def detailed_streaming_analysis():
                 usage = event.models_usage
                 print(f"   Tokens: {getattr(usage, 'prompt_tokens', 0)} prompt + {getattr(usage, 'completion_tokens', 0)} completion")
     
-    await Console(
-        assistant.on_messages_stream(
+    # Run the agent once and feed the same events to Console and the collector
+    await tee_stream(
+        default_agent().on_messages_stream(
             messages=[text_message],
             cancellation_token=CancellationToken()
-        )
+        ),
+        Console,
+        detailed_collector,
+        metrics.observe_stream,
     )
     
-    # Collect events separately for statistics
-    await detailed_collector()
-    
     end_time = time.time()
     
     # Print detailed statistics
@@ -221,6 +214,14 @@ async def main():
     
     # Test detailed streaming analysis
     await detailed_streaming_analysis()
+    
+    print_latency_summary()
+    
+    # Set AGENT_METRICS_FILE to metrics.json or metrics.prom to keep the numbers
+    metrics_file = os.getenv("AGENT_METRICS_FILE")
+    if metrics_file:
+        metrics.export(metrics_file)
+        print(f"💾 Metrics written to {metrics_file}")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
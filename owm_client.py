@@ -0,0 +1,193 @@
+import asyncio
+import functools
+import os
+
+import aiohttp
+from dotenv import load_dotenv
+
+from geocode_index import get_index
+from owm_scheduler import scheduler as shared_scheduler
+from singleflight import AsyncSingleFlight
+from weather_cache import normalize_key
+from weather_model import WeatherObservation, loads
+
+load_dotenv()
+
+WEATHER_URL = os.getenv("OWM_WEATHER_URL", "https://api.openweathermap.org/data/2.5/weather")
+FORECAST_URL = os.getenv("OWM_FORECAST_URL", "https://api.openweathermap.org/data/2.5/forecast")
+GEOCODE_URL = os.getenv("OWM_GEOCODE_URL", "http://api.openweathermap.org/geo/1.0/direct")
+
+
+class WeatherAPIError(Exception):
+    """Raised when OpenWeatherMap answers with a non-200 status"""
+
+    def __init__(self, status, url="", retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.url = url
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value):
+    # Only the delta-seconds form is used by OpenWeatherMap
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class OpenWeatherMapClient:
+    """Long-lived async OpenWeatherMap client backed by one pooled aiohttp session.
+
+    The session keeps connections alive between calls, caps connections per
+    host and caches DNS lookups, so repeated lookups skip TCP/TLS setup.
+    """
+
+    def __init__(
+        self,
+        api_key=None,
+        *,
+        limit=100,
+        limit_per_host=20,
+        dns_ttl=300,
+        keepalive_timeout=30.0,
+        total_timeout=10.0,
+        connect_timeout=3.0,
+        weather_url=WEATHER_URL,
+        forecast_url=FORECAST_URL,
+        geocode_url=GEOCODE_URL,
+        geocode_index=None,
+        scheduler=None,
+    ):
+        self.api_key = api_key or os.getenv("OPENWEATHERMAP_API_KEY")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.weather_url = weather_url
+        self.forecast_url = forecast_url
+        self.geocode_url = geocode_url
+        self.geocode_index = geocode_index
+        self.scheduler = scheduler or shared_scheduler
+        self.flights = AsyncSingleFlight()
+        self._session = None
+        self._loop = None
+        self._guard = None
+
+    def _get_session(self):
+        # A session is tied to the loop it was created on; scripts that call
+        # asyncio.run() more than once get a fresh pool per loop.
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            if self._guard is not None and not self._loop.is_closed():
+                # The old session can only be closed on its own loop, by its guard
+                self._loop.call_soon_threadsafe(self._guard.cancel)
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._loop = loop
+            self._guard = loop.create_task(_close_with_loop(self._session))
+        return self._session
+
+    async def _fetch_json(self, url, params, parse=loads):
+        async with self._get_session().get(url, params=params) as response:
+            if response.status != 200:
+                raise WeatherAPIError(response.status, url, _parse_retry_after(response.headers.get("Retry-After")))
+            # Raw bytes straight into the JSON backend (orjson when installed), no text decode first
+            return parse(await response.read())
+
+    async def _get_json(self, url, params, parse=loads):
+        # Every call shares the per-key quota with the pyowm paths
+        return await self.scheduler.call_async(self._fetch_json, url, {**params, "appid": self.api_key}, parse)
+
+    async def weather_by_coords(self, lat, lon, units="metric"):
+        """Current weather for a latitude/longitude pair as a WeatherObservation (always °C)"""
+        params = {"lat": lat, "lon": lon, "units": units}
+        parse = functools.partial(WeatherObservation.from_json, units=units)
+        return await self.flights.do(("coords", lat, lon, units), self._get_json, self.weather_url, params, parse)
+
+    async def geocode(self, city, country="", limit=1):
+        """Resolve a city (optionally qualified by country code) to geocoding matches"""
+        query = f"{city},{country}" if country else city
+        return await self._get_json(self.geocode_url, {"q": query, "limit": limit})
+
+    async def resolve(self, city, country=""):
+        """Return (lat, lon) for a city, preferring the local index over the live geocoder"""
+        if self.geocode_index is not None:
+            coords = self.geocode_index.lookup(city, country)
+            if coords is not None:
+                return coords
+        matches = await self.geocode(city, country)
+        if not matches:
+            raise LookupError(f"City not found: {city}")
+        lat, lon = matches[0]["lat"], matches[0]["lon"]
+        if self.geocode_index is not None:
+            # The journal append is file I/O; keep it off the event loop
+            await asyncio.to_thread(self.geocode_index.learn, city, country or matches[0].get("country", ""), lat, lon)
+        return lat, lon
+
+    async def weather_by_city(self, city, country="", units="metric"):
+        """Resolve a city to coordinates and return its current WeatherObservation"""
+        # Concurrent callers for the same (city, country, units) share one fetch
+        return await self.flights.do((*normalize_key(city, country), units), self._weather_by_city, city, country, units)
+
+    async def _weather_by_city(self, city, country, units):
+        lat, lon = await self.resolve(city, country)
+        return await self.weather_by_coords(lat, lon, units)
+
+    async def forecast_by_city(self, city, country="", units="metric"):
+        """5-day / 3-hour forecast payload for a city"""
+        key = ("forecast", *normalize_key(city, country), units)
+        return await self.flights.do(key, self._forecast_by_city, city, country, units)
+
+    async def _forecast_by_city(self, city, country, units):
+        lat, lon = await self.resolve(city, country)
+        return await self._get_json(self.forecast_url, {"lat": lat, "lon": lon, "units": units})
+
+    async def close(self):
+        if self._guard is not None:
+            self._guard.cancel()
+            self._guard = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+async def _close_with_loop(session):
+    """Hold session open until cancelled: by the client moving to another loop, or by
+    asyncio.run() cancelling leftover tasks as it shuts the loop down"""
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        await session.close()
+
+
+_client = None
+
+
+def get_client():
+    """Return the process-wide shared client"""
+    global _client
+    if _client is None:
+        _client = OpenWeatherMapClient(geocode_index=get_index())
+    return _client
+
+
+async def get_current_weather(city: str, country: str = "") -> str:
+    """Get the current weather for a city; country is an optional ISO code such as IN or GB"""
+    try:
+        observation = await get_client().weather_by_city(city, country)
+    except Exception as e:
+        return f"Could not get weather for {city}: {e}"
+    return observation.describe()
@@ -0,0 +1,296 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import re
+import threading
+import time
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+CALLS_PER_MINUTE = float(os.getenv("OWM_CALLS_PER_MINUTE", "60"))
+BURST = int(os.getenv("OWM_BURST", "10"))
+
+_priority = contextvars.ContextVar("owm_request_priority", default=INTERACTIVE)
+
+
+@contextlib.contextmanager
+def request_priority(priority):
+    """Run the enclosed weather calls at the given priority (INTERACTIVE or BACKGROUND)"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens per second up to ``capacity``; not thread-safe on its own"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Seconds until a token is available (0 if one is available now)"""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def pause(self, seconds):
+        """Hold every caller back, e.g. after a 429 with Retry-After"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class _Ticket:
+    __slots__ = ("priority", "seq", "wake")
+
+    def __init__(self, priority, seq, wake):
+        self.priority = priority
+        self.seq = seq
+        self.wake = wake
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+_PAYLOAD_STATUS = re.compile(r'"cod"\s*:\s*"?(\d{3})')
+
+
+def _status(exc):
+    """HTTP status of a failed weather call: WeatherAPIError.status, or the "cod" of a pyowm
+    APIRequestError's payload (pyowm keeps no status of its own); None when unknown"""
+    status = getattr(exc, "status", None)
+    if status is None and type(exc).__name__ == "APIRequestError":
+        match = _PAYLOAD_STATUS.search(str(exc))
+        status = int(match.group(1)) if match else None
+    return status
+
+
+def _client_error(exc):
+    """Whether a pyowm APIRequestError carries a 4xx other than 429 (a request that will fail again)"""
+    status = _status(exc)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+def retry_delay(exc, attempt, base=0.5, cap=30.0):
+    """Return how long to wait before retrying exc, or None if it should not be retried"""
+    # Imported here so the aiohttp-only path never loads pyowm
+    from pyowm.commons import exceptions as owm_exceptions
+
+    retry_after = getattr(exc, "retry_after", None)
+    status = getattr(exc, "status", None)
+    if status is not None:
+        if status != 429 and status < 500:
+            return None
+    elif isinstance(exc, (owm_exceptions.BadGatewayError, owm_exceptions.TimeoutError, asyncio.TimeoutError)):
+        pass
+    elif type(exc) is owm_exceptions.APIRequestError and not _client_error(exc):
+        # pyowm folds 400, 429 and most 5xx into APIRequestError carrying the raw payload;
+        # only the payload's "cod" tells them apart, and an unreadable one is retried
+        pass
+    else:
+        return None
+    if retry_after is not None:
+        # An upstream "Retry-After: 3600" must not park a worker, and every queue behind it, for an hour
+        return min(cap, float(retry_after))
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class RequestScheduler:
+    """Shared gate for every OpenWeatherMap call, sync (pyowm) or async (aiohttp).
+
+    Calls queue by priority, so interactive lookups go ahead of background
+    refreshes. A token bucket sized to the plan's per-minute quota releases
+    them, and 429/5xx responses are retried with backoff that honours
+    Retry-After. A 429 also pauses the whole bucket.
+    """
+
+    def __init__(self, calls_per_minute=CALLS_PER_MINUTE, burst=BURST, max_retries=3):
+        self.bucket = TokenBucket(calls_per_minute / 60.0, burst)
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._queue = []
+        self._seq = itertools.count()
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.rate_limited = 0
+        self.throttle_seconds = 0.0
+        self.max_queue_depth = 0
+
+    def _enqueue(self, priority, wake):
+        with self._lock:
+            ticket = _Ticket(priority, next(self._seq), wake)
+            heapq.heappush(self._queue, ticket)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            return ticket
+
+    def _try_acquire(self, ticket):
+        """Take a token if ticket is first in line; returns 0, seconds to wait, or None (not first)"""
+        with self._lock:
+            if self._queue[0] is not ticket:
+                return None
+            wait = self.bucket.wait_time()
+            if wait > 0:
+                return wait
+            self.bucket.take()
+            heapq.heappop(self._queue)
+            if self._queue:
+                self._queue[0].wake()
+            return 0.0
+
+    def _abandon(self, ticket):
+        with self._lock:
+            if ticket in self._queue:
+                was_head = self._queue[0] is ticket
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                if was_head and self._queue:
+                    self._queue[0].wake()
+
+    def _record_wait(self, waited):
+        with self._lock:
+            self.requests += 1
+            if waited > 0.001:
+                self.throttled += 1
+                self.throttle_seconds += waited
+
+    def acquire(self, priority=None):
+        """Block the calling thread until a request may be sent"""
+        event = threading.Event()
+        ticket = self._enqueue(_priority.get() if priority is None else priority, event.set)
+        started = time.monotonic()
+        acquired = False
+        try:
+            while True:
+                event.clear()
+                wait = self._try_acquire(ticket)
+                if wait == 0:
+                    acquired = True
+                    break
+                event.wait(wait)
+        finally:
+            if not acquired:
+                self._abandon(ticket)
+        self._record_wait(time.monotonic() - started)
+
+    async def acquire_async(self, priority=None):
+        """Wait on the event loop until a request may be sent"""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        ticket = self._enqueue(
+            _priority.get() if priority is None else priority, lambda: loop.call_soon_threadsafe(event.set)
+        )
+        started = time.monotonic()
+        acquired = False
+        try:
+            while True:
+                event.clear()
+                wait = self._try_acquire(ticket)
+                if wait == 0:
+                    acquired = True
+                    break
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(event.wait(), wait)
+        finally:
+            if not acquired:
+                self._abandon(ticket)
+        self._record_wait(time.monotonic() - started)
+
+    def _backoff(self, exc, attempt):
+        delay = retry_delay(exc, attempt)
+        if delay is None or attempt >= self.max_retries:
+            return None
+        with self._lock:
+            self.retries += 1
+            if _status(exc) == 429:
+                self.rate_limited += 1
+                self.bucket.pause(delay)
+        return delay
+
+    def call(self, fn, *args, priority=None, **kwargs):
+        """Run a blocking weather call through the scheduler, retrying 429/5xx"""
+        attempt = 0
+        while True:
+            self.acquire(priority)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, fn, *args, priority=None, **kwargs):
+        """Await ``fn(*args, **kwargs)`` through the scheduler, retrying 429/5xx"""
+        attempt = 0
+        while True:
+            await self.acquire_async(priority)
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "throttle_seconds": self.throttle_seconds,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+            }
+
+
+class ScheduledWeatherManager:
+    """Proxy for a pyowm WeatherManager that sends every API method through the scheduler"""
+
+    def __init__(self, mgr, scheduler):
+        self._mgr = mgr
+        self._scheduler = scheduler
+
+    def __getattr__(self, name):
+        attr = getattr(self._mgr, name)
+        if not callable(attr):
+            return attr
+
+        def scheduled_call(*args, **kwargs):
+            return self._scheduler.call(attr, *args, **kwargs)
+
+        return scheduled_call
+
+
+# One scheduler per process: the quota is per API key, not per module
+scheduler = RequestScheduler()
+
+
+def scheduled(mgr):
+    """Route a pyowm WeatherManager's calls through the shared scheduler"""
+    return ScheduledWeatherManager(mgr, scheduler)
@@ -1,30 +1,36 @@
 import asyncio
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from dotenv import load_dotenv
-import os
+from answer_cache import cached_run
+from lazy_clients import chat_client, shared
+from state_store import persist, resume
+from loop_profiler import profile_turn
+from stream_tee import stream_reply
 
-load_dotenv()
 
-api_key = os.getenv("OPENROUTER_API_KEY")
+def make_agent(model_client=None, **kwargs):
+    """Build a fresh assistant; agents keep conversation state, so each conversation needs its own"""
+    from autogen_agentchat.agents import AssistantAgent
+    return AssistantAgent(model_client=model_client or chat_client("openrouter"), name="HelpfulAgent", system_message="You are helpful AI Agent Assistant", **kwargs)
 
-oper_router_client = OpenAIChatCompletionClient(api_key=api_key, model="deepseek/deepseek-chat-v3.1", base_url="https://openrouter.ai/api/v1", model_info={
-    "family": "deepseek",
-    "provider": "openrouter/openrouter",
-    "type": "chat",
-    "vision": True,
-    "function_calling": True,
-    "json_output": True,
-    "structured_output": True,
-    "context_length": 8192,
-    "max_tokens": 4096,
-    "supported_features": ["chat", "vision", "function_calling"]
-})
+# Built on first use so importing this module stays cheap
+default_agent = shared(make_agent)
 
-router_agent = AssistantAgent(model_client=oper_router_client, name="HelpfulAgent", system_message="You are helpful AI Agent Assistant")
+async def chat(question, agent=None, session_id=None, stream=False):
+    """Ask the assistant; stream=True prints the answer token by token instead of all at the end"""
+    agent = agent or (default_agent(model_client_stream=True) if stream else default_agent())
+    if session_id:
+        await resume(agent, session_id)
+    # A no-op unless LOOP_PROFILE is set
+    async with profile_turn(agent.name):
+        if stream:
+            await stream_reply(agent, question)
+        elif session_id:
+            result = await agent.run(task=question)
+            print(result.messages[-1].content)
+        else:
+            # One-off questions can reuse the answer to an earlier rephrasing (ANSWER_CACHE=on)
+            print(await cached_run(agent, question))
+    if session_id:
+        await persist(agent, session_id)
 
-async def chat(question):
-    result = await router_agent.run(task=question)
-    print(result.messages[-1].content)
-
-asyncio.run(chat("What is the capital of France?"))
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(chat("What is the capital of France?", stream=True))
\ No newline at end of file
@@ -1,11 +1,20 @@
-from pyowm import OWM
-from pyowm.utils import config
+import asyncio
 from dotenv import load_dotenv
+from forecast_store import forecast_store
+from lazy_clients import weather_manager
+from owm_client import get_client
+from weather_cache import cached_weather_at_place
+from weather_model import WeatherObservation, iso_time
 import os
 
 # Load environment variables
 load_dotenv()
 
+async def fetch_forecast(city, country):
+    """Raw 5-day / 3-hour forecast JSON from the shared async client"""
+    # Not closed here: other callers share it, and its session closes with the loop (asyncio.run)
+    return await get_client().forecast_by_city(city, country)
+
 def get_weather_examples():
     """Demonstrate various pyowm features"""
     
@@ -18,9 +27,8 @@ def get_weather_examples():
         print("OPENWEATHERMAP_API_KEY=your_api_key_here")
         return
     
-    # Initialize OWM
-    owm = OWM(api_key)
-    mgr = owm.weather_manager()
+    # Initialize OWM (shared with every other lookup using this key)
+    mgr = weather_manager(api_key)
     
     print("🌤️  OpenWeatherMap API Examples")
     print("=" * 50)
@@ -28,32 +36,29 @@ def get_weather_examples():
     # Example 1: Current weather for a city
     print("\n1️⃣  Current Weather for London:")
     try:
-        observation = mgr.weather_at_place('London,GB')
-        weather = observation.weather
+        observation = WeatherObservation.from_pyowm(mgr.weather_at_place('London,GB'))
         
-        print(f"   📍 Location: {observation.location.name}, {observation.location.country}")
-        print(f"   🌡️  Temperature: {weather.temperature('celsius')['temp']:.1f}°C")
-        print(f"   💨 Wind: {weather.wind()['speed']:.1f} m/s")
-        print(f"   💧 Humidity: {weather.humidity}%")
-        print(f"   📊 Pressure: {weather.pressure['press']} hPa")
-        print(f"   👁️  Visibility: {weather.visibility_distance if weather.visibility_distance else 'N/A'} m")
-        print(f"   ☁️  Status: {weather.detailed_status}")
-        print(f"   🌅 Sunrise: {weather.sunrise_time(timeformat='iso')}")
-        print(f"   🌇 Sunset: {weather.sunset_time(timeformat='iso')}")
+        print(f"   📍 Location: {observation.city}, {observation.country}")
+        print(f"   🌡️  Temperature: {observation.temp:.1f}°C")
+        print(f"   💨 Wind: {observation.wind_speed:.1f} m/s")
+        print(f"   💧 Humidity: {observation.humidity}%")
+        print(f"   📊 Pressure: {observation.pressure} hPa")
+        print(f"   👁️  Visibility: {observation.visibility or 'N/A'} m")
+        print(f"   ☁️  Status: {observation.description}")
+        print(f"   🌅 Sunrise: {iso_time(observation.sunrise)}")
+        print(f"   🌇 Sunset: {iso_time(observation.sunset)}")
     except Exception as e:
         print(f"   ❌ Error: {e}")
     
-    # Example 2: Weather forecast
+    # Example 2: Weather forecast, loaded straight from the JSON into the columnar store
     print("\n2️⃣  3-Day Forecast for New York:")
     try:
-        forecaster = mgr.forecast_at_place('New York,US', '3h')
-        forecast = forecaster.forecast
-        
-        for i, weather in enumerate(forecast[:8]):  # Show first 8 periods (24 hours)
-            time = weather.reference_time('iso')
-            temp = weather.temperature('celsius')['temp']
-            status = weather.detailed_status
-            print(f"   {time}: {temp:.1f}°C - {status}")
+        forecast_store.put_owm("New York,US", asyncio.run(fetch_forecast("New York", "US")))
+        for day in forecast_store.daily("New York,US", days=3):
+            print(f"   {day['date']}: {day['temp_min']:.1f}–{day['temp_max']:.1f}°C "
+                  f"(avg {day['temp_mean']:.1f}°C), humidity {day['humidity_mean']}%, wind up to {day['wind_max']:.1f} m/s")
+        warm = forecast_store.periods_where("New York,US", "temp", ">", 25)
+        print(f"   🔥 Periods above 25°C: {', '.join(warm) if warm else 'none'}")
     except Exception as e:
         print(f"   ❌ Error: {e}")
     
@@ -61,25 +66,24 @@ def get_weather_examples():
     print("\n3️⃣  Weather at Coordinates (Tokyo area):")
     try:
         # Tokyo coordinates: 35.6762° N, 139.6503° E
-        observation = mgr.weather_at_coords(35.6762, 139.6503)
-        weather = observation.weather
+        observation = WeatherObservation.from_pyowm(mgr.weather_at_coords(35.6762, 139.6503))
         
         print(f"   📍 Coordinates: 35.6762°N, 139.6503°E")
-        print(f"   🌡️  Temperature: {weather.temperature('celsius')['temp']:.1f}°C")
-        print(f"   💨 Wind: {weather.wind()['speed']:.1f} m/s")
-        print(f"   💧 Humidity: {weather.humidity}%")
-        print(f"   ☁️  Status: {weather.detailed_status}")
+        print(f"   🌡️  Temperature: {observation.temp:.1f}°C")
+        print(f"   💨 Wind: {observation.wind_speed:.1f} m/s")
+        print(f"   💧 Humidity: {observation.humidity}%")
+        print(f"   ☁️  Status: {observation.description}")
     except Exception as e:
         print(f"   ❌ Error: {e}")
     
     # Example 4: Search for cities
     print("\n4️⃣  City Search Results for 'Paris':")
     try:
-        cities = mgr.weather_at_places('Paris', 'like', limit=3)
+        cities = [WeatherObservation.from_pyowm(city) for city in mgr.weather_at_places('Paris', 'like', limit=3)]
         for i, city in enumerate(cities):
-            print(f"   {i+1}. {city.location.name}, {city.location.country}")
-            print(f"      Temperature: {city.weather.temperature('celsius')['temp']:.1f}°C")
-            print(f"      Status: {city.weather.detailed_status}")
+            print(f"   {i+1}. {city.city}, {city.country}")
+            print(f"      Temperature: {city.temp:.1f}°C")
+            print(f"      Status: {city.description}")
     except Exception as e:
         print(f"   ❌ Error: {e}")
 
@@ -91,24 +95,22 @@ def get_weather_for_city(city_name, country_code="US"):
         print("❌ Error: OPENWEATHERMAP_API_KEY not found in .env file")
         return
     
-    owm = OWM(api_key)
-    mgr = owm.weather_manager()
+    mgr = weather_manager(api_key)
     
     try:
-        observation = mgr.weather_at_place(f'{city_name},{country_code}')
-        weather = observation.weather
+        observation = cached_weather_at_place(mgr, city_name, country_code)
         
         print(f"\n🌤️  Weather in {city_name}, {country_code}")
         print("=" * 40)
-        print(f"🌡️  Temperature: {weather.temperature('celsius')['temp']:.1f}°C")
-        print(f"   Feels like: {weather.temperature('celsius')['feels_like']:.1f}°C")
-        print(f"💨 Wind Speed: {weather.wind()['speed']:.1f} m/s")
-        print(f"💧 Humidity: {weather.humidity}%")
-        print(f"📊 Pressure: {weather.pressure['press']} hPa")
-        print(f"👁️  Visibility: {weather.visibility_distance if weather.visibility_distance else 'N/A'} m")
-        print(f"☁️  Conditions: {weather.detailed_status}")
-        print(f"🌅 Sunrise: {weather.sunrise_time(timeformat='iso')}")
-        print(f"🌇 Sunset: {weather.sunset_time(timeformat='iso')}")
+        print(f"🌡️  Temperature: {observation.temp:.1f}°C")
+        print(f"   Feels like: {observation.feels_like:.1f}°C")
+        print(f"💨 Wind Speed: {observation.wind_speed:.1f} m/s")
+        print(f"💧 Humidity: {observation.humidity}%")
+        print(f"📊 Pressure: {observation.pressure} hPa")
+        print(f"👁️  Visibility: {observation.visibility or 'N/A'} m")
+        print(f"☁️  Conditions: {observation.description}")
+        print(f"🌅 Sunrise: {iso_time(observation.sunrise)}")
+        print(f"🌇 Sunset: {iso_time(observation.sunset)}")
         
     except Exception as e:
         print(f"❌ Error getting weather for {city_name}: {e}")
@@ -0,0 +1,154 @@
+import asyncio
+import contextlib
+import contextvars
+import threading
+
+_solo = contextvars.ContextVar("singleflight_solo", default=False)
+
+
+@contextlib.contextmanager
+def solo():
+    """Calls made inside this block run on their own instead of joining an in-flight call.
+
+    Hedged retries use it: a duplicate request that joined the slow original
+    would finish no sooner than the original.
+    """
+    token = _solo.set(True)
+    try:
+        yield
+    finally:
+        _solo.reset(token)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent identical blocking calls into one.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for and share its result (or exception). A call made
+    under ``solo()`` runs independently, and if it succeeds first its result
+    is handed to the waiters and the slow call is dropped from the table.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.solo = 0
+
+    def do(self, key, fn):
+        if _solo.get():
+            with self._lock:
+                self.solo += 1
+            result = fn()
+            with self._lock:
+                call = self._calls.pop(key, None)
+                if call is not None:
+                    self._settle(call, result, None)
+            return result
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, call, None, e)
+            raise
+        self._finish(key, call, result, None)
+        return result
+
+    @staticmethod
+    def _settle(call, result, error):
+        # Caller holds the lock; the first outcome wins
+        if not call.done.is_set():
+            call.result = result
+            call.error = error
+            call.done.set()
+
+    def _finish(self, key, call, result, error):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            self._settle(call, result, error)
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "solo": self.solo, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """Collapse concurrent identical coroutine calls into one shared task.
+
+    Waiters await a shielded future, so a caller that gets cancelled does not
+    cancel the fetch for everyone else. As with SingleFlight, a ``solo()``
+    call that succeeds first settles the waiters of the in-flight call.
+    """
+
+    def __init__(self):
+        self._futures = {}
+        self._tasks = set()
+        self.calls = 0
+        self.coalesced = 0
+        self.solo = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        if _solo.get():
+            self.solo += 1
+            result = await fn(*args, **kwargs)
+            future = self._futures.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(result)
+            return result
+
+        future = self._futures.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            # Nobody may be left waiting on it; don't warn about an unread error
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._futures[key] = future
+            self.calls += 1
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks.add(task)
+
+            def _done(finished):
+                self._tasks.discard(finished)
+                if self._futures.get(key) is future:
+                    del self._futures[key]
+                if finished.cancelled():
+                    if not future.done():
+                        future.cancel()
+                elif finished.exception() is not None:
+                    if not future.done():
+                        future.set_exception(finished.exception())
+                elif not future.done():
+                    future.set_result(finished.result())
+
+            task.add_done_callback(_done)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def stats(self):
+        return {"calls": self.calls, "coalesced": self.coalesced, "solo": self.solo, "in_flight": len(self._futures)}
@@ -0,0 +1,285 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import weakref
+
+STATE_DIR = os.getenv("AGENT_STATE_DIR", os.path.join("data", "agent_state"))
+# Rewrite a session's log as one snapshot once this many deltas follow the last one
+COMPACT_AFTER = int(os.getenv("AGENT_STATE_COMPACT_AFTER", "32"))
+FSYNC = os.getenv("AGENT_STATE_FSYNC", "0") == "1"
+
+
+def _messages(state):
+    """The agent's message list inside a saved state, or None for states without one"""
+    context = state.get("llm_context") if isinstance(state, dict) else None
+    messages = context.get("messages") if isinstance(context, dict) else None
+    return messages if isinstance(messages, list) else None
+
+
+def _meta(state):
+    """Everything in a state except its messages, as canonical JSON"""
+    context = {k: v for k, v in state["llm_context"].items() if k != "messages"}
+    return json.dumps({**state, "llm_context": context}, sort_keys=True)
+
+
+def _cancellation_token():
+    from autogen_core import CancellationToken
+
+    return CancellationToken()
+
+
+def _digest(message):
+    return hashlib.sha1(json.dumps(message, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class _Head:
+    """What the log already holds for a session: message count, last message digest, other fields"""
+
+    __slots__ = ("count", "last", "meta", "deltas", "lock")
+
+    def __init__(self):
+        self.count = 0
+        self.last = None
+        self.meta = None
+        self.deltas = 0
+        self.lock = threading.Lock()
+
+
+class StateStore:
+    """Append-only, per-session log of ``save_state()`` results.
+
+    Each session gets a JSON-lines file under ``directory``. A save appends
+    only the messages added since the last save ("append" record) when the
+    new state extends what is on disk; anything else (a bounded context that
+    dropped old messages, a changed non-message field, a session whose log
+    this process has not read) is written as a full "snapshot" record. Logs
+    are only read when a session resumes. Once ``compact_after`` deltas
+    follow the last snapshot, a background thread rewrites the log as a
+    single snapshot. File I/O runs in worker threads.
+    """
+
+    def __init__(self, directory=STATE_DIR, compact_after=COMPACT_AFTER, fsync=FSYNC):
+        self.directory = directory
+        self.compact_after = compact_after
+        self.fsync = fsync
+        self._heads = {}  # session_id -> _Head, for sessions saved or loaded by this process
+        self._heads_lock = threading.Lock()
+        self._compacting = set()
+        self.snapshots = 0
+        self.appends = 0
+        self.bytes_written = 0
+        self.loads = 0
+        self.compactions = 0
+
+    def _path(self, session_id):
+        name = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.jsonl")
+
+    def _head(self, session_id):
+        with self._heads_lock:
+            head = self._heads.get(session_id)
+            if head is None:
+                head = self._heads[session_id] = _Head()
+            return head
+
+    def _append(self, path, records):
+        data = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        with open(path, "ab") as f:
+            f.write(data)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self.bytes_written += len(data)
+
+    def _drop_torn_tail(self, path, keep=None):
+        """Cut a half-written last record off the log, so the next append starts on a fresh line.
+
+        ``keep`` is the byte length known to be good; without it, everything
+        after the last newline is dropped.
+        """
+        try:
+            f = open(path, "r+b")
+        except FileNotFoundError:
+            return
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            if keep is None:
+                keep = size
+                while keep:
+                    start = max(0, keep - 4096)
+                    f.seek(start)
+                    chunk = f.read(keep - start)
+                    newline = chunk.rfind(b"\n")
+                    if newline >= 0:
+                        keep = start + newline + 1
+                        break
+                    keep = start
+            if keep < size:
+                f.truncate(keep)
+
+    def _remember(self, head, state, messages):
+        head.count = len(messages)
+        head.last = _digest(messages[-1]) if messages else None
+        head.meta = _meta(state)
+
+    def _write(self, session_id, state):
+        head = self._head(session_id)
+        path = self._path(session_id)
+        messages = _messages(state)
+        with head.lock:
+            if (
+                messages is not None
+                and head.meta is not None
+                and len(messages) >= head.count
+                and (head.count == 0 or _digest(messages[head.count - 1]) == head.last)
+                and _meta(state) == head.meta
+            ):
+                delta = messages[head.count:]
+                if not delta:
+                    return False
+                self._append(path, [{"op": "append", "session_id": session_id, "messages": delta}])
+                head.deltas += 1
+                self.appends += 1
+            else:
+                os.makedirs(self.directory, exist_ok=True)
+                # This process may never have replayed the log; a crash may have left it mid-record
+                self._drop_torn_tail(path)
+                self._append(path, [{"op": "snapshot", "session_id": session_id, "state": state}])
+                head.deltas = 0
+                self.snapshots += 1
+            if messages is not None:
+                self._remember(head, state, messages)
+            else:
+                head.meta = None
+            return head.deltas >= self.compact_after
+
+    def _replay(self, path):
+        """Rebuild (state, deltas since its snapshot) from a log, truncating any torn tail"""
+        state = None
+        deltas = 0
+        good = 0
+        torn = False
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash mid-write can leave a torn last line; everything before it is intact
+                    torn = True
+                    break
+                good += len(line)
+                if record["op"] == "snapshot":
+                    state = record["state"]
+                    deltas = 0
+                elif record["op"] == "append" and state is not None:
+                    _messages(state).extend(record["messages"])
+                    deltas += 1
+        if torn:
+            # Appends after a torn line would be glued onto it and lost on the next replay
+            self._drop_torn_tail(path, good)
+        return state, deltas
+
+    def _read(self, session_id):
+        path = self._path(session_id)
+        head = self._head(session_id)
+        with head.lock:
+            if not os.path.exists(path):
+                return None
+            state, deltas = self._replay(path)
+            self.loads += 1
+            messages = _messages(state) if state is not None else None
+            if messages is not None:
+                # Later saves from the resumed agent can append to this log
+                self._remember(head, state, messages)
+                head.deltas = deltas
+            return state
+
+    def _compact(self, session_id):
+        head = self._head(session_id)
+        path = self._path(session_id)
+        try:
+            with head.lock:
+                if not os.path.exists(path):
+                    return
+                state, _ = self._replay(path)
+                if state is None:
+                    return
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(json.dumps({"op": "snapshot", "session_id": session_id, "state": state}) + "\n")
+                os.replace(tmp_path, path)
+                head.deltas = 0
+                self.compactions += 1
+        finally:
+            with self._heads_lock:
+                self._compacting.discard(session_id)
+
+    def _schedule_compaction(self, session_id):
+        with self._heads_lock:
+            if session_id in self._compacting:
+                return
+            self._compacting.add(session_id)
+        threading.Thread(target=self._compact, args=(session_id,), daemon=True).start()
+
+    def _delete(self, session_id):
+        head = self._head(session_id)
+        with head.lock:
+            path = self._path(session_id)
+            found = os.path.exists(path)
+            if found:
+                os.remove(path)
+        with self._heads_lock:
+            self._heads.pop(session_id, None)
+        return found
+
+    async def save(self, session_id, state):
+        """Persist a ``save_state()`` result; costs the messages added since the last save"""
+        if await asyncio.to_thread(self._write, session_id, state):
+            self._schedule_compaction(session_id)
+
+    async def load(self, session_id):
+        """Rebuild the last saved state for a session, or None if it has none"""
+        return await asyncio.to_thread(self._read, session_id)
+
+    async def delete(self, session_id):
+        """Remove a session's log; returns whether there was one"""
+        return await asyncio.to_thread(self._delete, session_id)
+
+    def stats(self):
+        return {
+            "sessions": len(self._heads),
+            "snapshots": self.snapshots,
+            "appends": self.appends,
+            "bytes_written": self.bytes_written,
+            "loads": self.loads,
+            "compactions": self.compactions,
+        }
+
+
+_resumed = weakref.WeakKeyDictionary()  # agent -> session it already holds
+
+
+async def resume(agent, session_id, store=None):
+    """Load a session's saved state into agent once; later calls for the same session are free"""
+    if _resumed.get(agent) == session_id:
+        return True
+    state = await (store or state_store).load(session_id)
+    if state is not None:
+        await agent.load_state(state)
+    else:
+        await agent.on_reset(_cancellation_token())
+    _resumed[agent] = session_id
+    return state is not None
+
+
+async def persist(agent, session_id, store=None):
+    """Append what agent has added to its conversation since the last save"""
+    await (store or state_store).save(session_id, await agent.save_state())
+
+
+# Shared store; nothing touches the disk until a session is saved or resumed
+state_store = StateStore()
@@ -0,0 +1,119 @@
+import asyncio
+import sys
+
+_DONE = object()
+
+
+async def _drain(queue):
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            return
+        yield item
+
+
+async def _put(queue, item, sink_task):
+    """Put item on queue unless the sink has already stopped consuming"""
+    if sink_task.done():
+        return
+    put = asyncio.ensure_future(queue.put(item))
+    await asyncio.wait({put, sink_task}, return_when=asyncio.FIRST_COMPLETED)
+    if not put.done():
+        put.cancel()
+
+
+async def _pump(stream, queues, tasks):
+    try:
+        async for event in stream:
+            for queue, task in zip(queues, tasks):
+                await _put(queue, event, task)
+    finally:
+        if hasattr(stream, "aclose"):
+            await stream.aclose()
+
+
+async def tee_stream(stream, *sinks, maxsize=32):
+    """Consume an agent event stream once and fan every event out to each sink.
+
+    A sink is an async callable that takes an async iterator of events, e.g.
+    ``Console`` or ``lambda events: collector(events)``. Each sink reads from
+    its own bounded queue, so the source is never read more than ``maxsize``
+    events ahead of the slowest sink. Returns the sinks' return values.
+
+    A sink that raises (e.g. a client that went away) stops the tee at once:
+    the read in progress is cancelled, the source closed and the error raised
+    once the other sinks have seen the end of the stream.
+    """
+    queues = [asyncio.Queue(maxsize) for _ in sinks]
+    tasks = [asyncio.ensure_future(sink(_drain(queue))) for sink, queue in zip(sinks, queues)]
+    # One task reads the whole source, so context set inside it (tracing spans) stays in one Context
+    pump = asyncio.ensure_future(_pump(stream, queues, tasks))
+
+    def stop_on_failure(task):
+        if _failed(task):
+            pump.cancel()
+
+    for task in tasks:
+        task.add_done_callback(stop_on_failure)
+
+    try:
+        await asyncio.wait({pump})
+        if not pump.cancelled():
+            pump.result()
+    finally:
+        if not pump.done():
+            pump.cancel()
+            await asyncio.wait({pump})
+        for queue, task in zip(queues, tasks):
+            await _put(queue, _DONE, task)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+def _failed(task):
+    return not task.cancelled() and task.exception() is not None
+
+
+async def render_tokens(events, out=None):
+    """Stream sink: print model tokens as they arrive and return the run's TaskResult.
+
+    Replies that were not streamed (tool-call summaries, clients without
+    streaming) are printed whole when their message arrives.
+    """
+    from autogen_agentchat.base import TaskResult
+    from autogen_agentchat.messages import BaseChatMessage, ModelClientStreamingChunkEvent
+
+    write = (out or sys.stdout).write
+    flush = (out or sys.stdout).flush
+    streamed = False
+    result = None
+    async for event in events:
+        if isinstance(event, ModelClientStreamingChunkEvent):
+            write(event.content)
+            flush()
+            streamed = True
+        elif isinstance(event, TaskResult):
+            result = event
+        elif isinstance(event, BaseChatMessage) and event.source != "user":
+            if not streamed:
+                write(event.to_text())
+            write("\n")
+            flush()
+            streamed = False
+    return result
+
+
+async def stream_reply(agent, task, cancellation_token=None):
+    """Run agent on task with tokens rendered live; returns (TaskResult, RunRecorder) with time-to-first-token"""
+    from agent_metrics import metrics
+
+    result, run = await tee_stream(
+        agent.run_stream(task=task, cancellation_token=cancellation_token), render_tokens, metrics.observe_stream
+    )
+    if run.time_to_first_token is not None:
+        print(f"⚡ First token after {run.time_to_first_token:.3f}s, done after {run.duration:.3f}s")
+    return result, run
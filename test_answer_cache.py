@@ -0,0 +1,95 @@
+import asyncio
+import types
+
+import pytest
+
+import answer_cache
+from answer_cache import AnswerCache, anchors, answer_ttl, cached_run, shingles
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(str(tmp_path / "answers.jsonl"))
+
+
+def test_rephrased_question_hits(cache):
+    cache.put("What is the capital of France?", "Paris", "assistant")
+    assert cache.lookup("what is capital of France", "assistant") == "Paris"
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.parametrize(
+    "asked, other",
+    [
+        ("What's the weather like in Chennai today?", "What's the weather like in Mumbai today?"),
+        ("What is the sum of 12 and 30?", "What is the sum of 12 and 31?"),
+        ("Is Paris bigger than London?", "Is London bigger than Paris?"),
+        ("Who is the president of France?", "Who was the president of France?"),
+    ],
+)
+def test_questions_asking_something_else_miss(cache, asked, other):
+    cache.put(asked, "cached answer", "assistant")
+    assert cache.lookup(other, "assistant") is None
+
+
+def test_namespaces_are_separate(cache):
+    cache.put("What is the capital of France?", "Paris", "assistant")
+    assert cache.lookup("What is the capital of France?", "weather_assistant") is None
+
+
+def test_short_questions_are_not_cached(cache):
+    assert shingles("what now?") == frozenset()
+    cache.put("what now?", "a cat")
+    assert cache.lookup("what now?") is None
+
+
+def test_anchors_are_numbers_and_names():
+    assert anchors("Compare Paris and London in 2024") == {"paris", "london", "2024"}
+    assert anchors("what is the capital of france") == frozenset()
+
+
+def test_expired_answers_are_not_served(cache, monkeypatch):
+    cache.put("What is the capital of France?", "Paris", ttl=10)
+    now = answer_cache.time.time()
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now + 11)
+    assert cache.lookup("What is the capital of France?") is None
+
+
+def test_answers_survive_a_restart(cache):
+    cache.put("What is the capital of France?", "Paris")
+    assert AnswerCache(cache.path).lookup("What is the capital of France?") == "Paris"
+
+
+def test_answer_ttl_uses_the_shortest_tool_policy():
+    def execution(*names):
+        results = [types.SimpleNamespace(name=name) for name in names]
+        return type("ToolCallExecutionEvent", (), {"content": results})()
+
+    assert answer_ttl([]) is None
+    assert answer_ttl([execution("addNumbers", "get_weather")]) == answer_cache.WEATHER_TTL
+    assert answer_ttl([execution("send_email")]) == 0.0
+
+
+def test_cached_run_keys_weather_answers_by_place(tmp_path, monkeypatch):
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE", "on")
+    monkeypatch.setattr(answer_cache, "_cache", AnswerCache(str(tmp_path / "answers.jsonl")))
+    runs = []
+
+    class Agent:
+        name = "weather_assistant"
+
+        async def run(self, task):
+            runs.append(task)
+            message = types.SimpleNamespace(to_text=lambda: f"answer {len(runs)}")
+            return types.SimpleNamespace(messages=[message])
+
+    async def main():
+        agent = Agent()
+        question = "what is the weather like in chennai today"
+        first = await cached_run(agent, question, ttl=300, key="chennai,in")
+        again = await cached_run(agent, question, ttl=300, key="chennai,in")
+        other = await cached_run(agent, question.replace("chennai", "mumbai"), ttl=300, key="mumbai,in")
+        return first, again, other
+
+    assert asyncio.run(main()) == ("answer 1", "answer 1", "answer 2")
+    assert len(runs) == 2
@@ -0,0 +1,81 @@
+import pytest
+
+from geocode_index import GeocodeIndex, build_index, country_code, normalize_name
+
+GAZETTEER = """\
+Chennai\tIN\t13.08784\t80.27847\t4681087
+London\tGB\t51.50853\t-0.12574\t8961989
+London\tCA\t42.98339\t-81.23304\t346765
+Londonderry\tGB\t54.9981\t-7.30934\t83652
+São Paulo\tBR\t-23.5475\t-46.63611\t10021295
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    gazetteer = tmp_path / "cities.txt"
+    gazetteer.write_text(GAZETTEER, encoding="utf-8")
+    path = str(tmp_path / "cities.idx")
+    assert build_index(str(gazetteer), path) == 5
+    index = GeocodeIndex(path)
+    yield index
+    index.close()
+
+
+def test_normalize_name_ignores_case_accents_and_spacing():
+    assert normalize_name("  São   PAULO ") == "sao paulo"
+
+
+def test_country_code_keeps_only_iso_alpha2():
+    assert country_code(" gb ") == "GB"
+    assert country_code("United Kingdom") == ""
+    assert country_code("日本") == ""
+    assert country_code(None) == ""
+
+
+def test_lookup_prefers_the_most_populous_match(index):
+    assert index.lookup("London") == (51.50853, -0.12574)
+    assert index.lookup("london", "ca") == (42.98339, -81.23304)
+    assert index.lookup("Sao Paulo") == (-23.5475, -46.63611)
+
+
+def test_lookup_misses(index):
+    assert index.lookup("Atlantis") is None
+    assert index.lookup("Chennai", "GB") is None
+
+
+def test_prefix_lists_names_in_order(index):
+    names = [(name, country) for name, country, _, _ in index.prefix("lond")]
+    assert names == [("london", "CA"), ("london", "GB"), ("londonderry", "GB")]
+    assert len(index.prefix("lond", limit=1)) == 1
+
+
+def test_learned_entries_survive_a_reopen(index):
+    index.learn("Zürich", "ch", 47.36667, 8.55)
+    assert index.lookup("zurich", "CH") == (47.36667, 8.55)
+    reopened = GeocodeIndex(index.path)
+    try:
+        assert reopened.lookup("Zurich") == (47.36667, 8.55)
+        assert len(reopened) == 6
+    finally:
+        reopened.close()
+
+
+def test_compact_folds_learned_entries_into_the_index(index, tmp_path):
+    index.learn("Zürich", "CH", 47.36667, 8.55)
+    index.learn("Kyoto", "日本", 35.02107, 135.75385)
+    index.compact()
+    assert not (tmp_path / "cities.idx.learned").exists()
+    assert len(index) == 7
+    assert index.lookup("Zurich", "CH") == (47.36667, 8.55)
+    assert index.lookup("Kyoto") == (35.02107, 135.75385)
+    assert index.lookup("London") == (51.50853, -0.12574)
+    names = {name for name, _, _ in index.entries()}
+    assert {"zurich", "kyoto", "chennai"} <= names
+
+
+def test_a_file_that_is_not_an_index_is_rejected(tmp_path):
+    path = tmp_path / "bogus.idx"
+    path.write_bytes(b"NOTANIDX" + b"\0" * 16)
+    with pytest.raises(ValueError):
+        GeocodeIndex(str(path))
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from pyowm.commons.exceptions import APIRequestError, NotFoundError
+
+import owm_scheduler
+from owm_client import WeatherAPIError
+from owm_scheduler import BACKGROUND, INTERACTIVE, RequestScheduler, TokenBucket, request_priority, retry_delay
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(owm_scheduler.time, "monotonic", fake)
+    return fake
+
+
+def test_bucket_allows_a_burst_then_waits_for_refill(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    for _ in range(3):
+        assert bucket.wait_time() == 0
+        bucket.take()
+    assert bucket.wait_time() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.wait_time() == 0
+
+
+def test_bucket_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate=10.0, capacity=2)
+    clock.now += 60
+    bucket.wait_time()
+    assert bucket.tokens == 2
+
+
+def test_pause_holds_callers_back(clock):
+    bucket = TokenBucket(rate=1.0, capacity=5)
+    bucket.pause(4)
+    assert bucket.wait_time() == pytest.approx(4)
+    clock.now += 4
+    assert bucket.wait_time() == 0
+
+
+def test_retry_delay_honours_retry_after_up_to_the_cap():
+    assert retry_delay(WeatherAPIError(429, retry_after=2), 0) == 2
+    assert retry_delay(WeatherAPIError(503, retry_after=3600), 0, cap=30.0) == 30.0
+
+
+def test_retry_delay_backs_off_exponentially_with_jitter():
+    for attempt in range(6):
+        assert 0 <= retry_delay(WeatherAPIError(500), attempt, base=0.5, cap=4.0) <= min(4.0, 0.5 * 2**attempt)
+
+
+@pytest.mark.parametrize("status", [400, 401, 404])
+def test_client_errors_are_not_retried(status):
+    assert retry_delay(WeatherAPIError(status), 0) is None
+
+
+def test_pyowm_errors_are_retried_by_payload_status():
+    assert retry_delay(APIRequestError('{"cod": 429, "message": "limit"}'), 0) is not None
+    assert retry_delay(APIRequestError('{"cod": "503"}'), 0) is not None
+    assert retry_delay(APIRequestError("<html>bad gateway</html>"), 0) is not None
+    assert retry_delay(APIRequestError('{"cod": "400", "message": "bad"}'), 0) is None
+    assert retry_delay(NotFoundError("no such city"), 0) is None
+
+
+def test_call_retries_then_succeeds(monkeypatch):
+    monkeypatch.setattr(owm_scheduler, "retry_delay", lambda exc, attempt: 0.0 if isinstance(exc, WeatherAPIError) else None)
+    scheduler = RequestScheduler(calls_per_minute=6000, burst=10)
+    outcomes = [WeatherAPIError(503), WeatherAPIError(429), "ok"]
+
+    def fetch():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert scheduler.call(fetch) == "ok"
+    assert scheduler.stats()["retries"] == 2
+    assert scheduler.stats()["rate_limited"] == 1
+
+
+def test_call_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(owm_scheduler, "retry_delay", lambda exc, attempt: 0.0)
+    scheduler = RequestScheduler(calls_per_minute=6000, burst=10, max_retries=2)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        raise WeatherAPIError(500)
+
+    with pytest.raises(WeatherAPIError):
+        scheduler.call(fetch)
+    assert len(calls) == 3
+
+
+def test_interactive_calls_go_ahead_of_queued_background_ones():
+    scheduler = RequestScheduler(calls_per_minute=600, burst=1)
+    scheduler.acquire()  # spend the burst: everything below queues for refills
+    order = []
+
+    def worker(priority, name):
+        scheduler.acquire(priority)
+        order.append(name)
+
+    background = [threading.Thread(target=worker, args=(BACKGROUND, f"bg{i}")) for i in range(2)]
+    for thread in background:
+        thread.start()
+    while scheduler.stats()["queue_depth"] < 2:
+        time.sleep(0.001)
+    interactive = threading.Thread(target=worker, args=(INTERACTIVE, "fg"))
+    interactive.start()
+    for thread in background + [interactive]:
+        thread.join(5)
+    assert order[0] == "fg"
+
+
+def test_request_priority_applies_to_async_callers():
+    scheduler = RequestScheduler(calls_per_minute=600, burst=1)
+    order = []
+
+    async def fetch(name):
+        await scheduler.acquire_async()
+        order.append(name)
+
+    async def main():
+        await scheduler.acquire_async()
+        with request_priority(BACKGROUND):
+            background = asyncio.ensure_future(fetch("bg"))
+        await asyncio.sleep(0.01)
+        await asyncio.gather(background, fetch("fg"))
+
+    asyncio.run(main())
+    assert order == ["fg", "bg"]
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight, solo
+
+
+def test_concurrent_calls_share_one_run():
+    flights = SingleFlight()
+    runs = []
+    release = threading.Event()
+
+    def fetch():
+        runs.append(1)
+        release.wait(5)
+        return "sunny"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do("chennai", fetch))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while flights.stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["sunny"] * 5
+    assert len(runs) == 1
+    assert flights.stats() == {"calls": 1, "coalesced": 4, "solo": 0, "in_flight": 0}
+
+
+def test_errors_reach_every_waiter_and_are_not_remembered():
+    flights = SingleFlight()
+
+    def fail():
+        raise LookupError("City not found")
+
+    with pytest.raises(LookupError):
+        flights.do("atlantis", fail)
+    assert flights.do("atlantis", lambda: "found") == "found"
+
+
+def test_solo_call_settles_the_waiters_of_a_slow_call():
+    flights = SingleFlight()
+    slow_started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        slow_started.set()
+        release.wait(5)
+        return "slow"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("key", slow)))
+    leader.start()
+    slow_started.wait(5)
+    waiter = threading.Thread(target=lambda: results.append(flights.do("key", lambda: "unused")))
+    waiter.start()
+    while flights.stats()["coalesced"] < 1:
+        time.sleep(0.001)
+    with solo():
+        assert flights.do("key", lambda: "fast") == "fast"
+    waiter.join(5)
+    assert results == ["fast"]
+    release.set()
+    leader.join(5)
+
+
+def test_async_calls_share_one_task():
+    flights = AsyncSingleFlight()
+    runs = []
+
+    async def fetch(city):
+        runs.append(city)
+        await asyncio.sleep(0.01)
+        return f"{city}: sunny"
+
+    async def main():
+        return await asyncio.gather(*(flights.do(("weather", "chennai"), fetch, "chennai") for _ in range(5)))
+
+    assert asyncio.run(main()) == ["chennai: sunny"] * 5
+    assert runs == ["chennai"]
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_different_keys_run_separately():
+    flights = AsyncSingleFlight()
+
+    async def fetch(city):
+        await asyncio.sleep(0)
+        return city
+
+    async def main():
+        return await asyncio.gather(flights.do("a", fetch, "a"), flights.do("b", fetch, "b"))
+
+    assert asyncio.run(main()) == ["a", "b"]
+    assert flights.stats()["calls"] == 2
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_fetch():
+    flights = AsyncSingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flights.do("key", fetch))
+        second = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "done"
@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+
+from state_store import StateStore
+
+
+def state(*texts, **extra):
+    messages = [{"type": "UserMessage", "content": text, "source": "user"} for text in texts]
+    return {"type": "AssistantAgentState", "version": "1.0.0", "llm_context": {"messages": messages}, **extra}
+
+
+def texts(loaded):
+    return [message["content"] for message in loaded["llm_context"]["messages"]]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return StateStore(str(tmp_path), compact_after=1000)
+
+
+def records(store, session_id):
+    with open(store._path(session_id), encoding="utf-8") as f:
+        return [json.loads(line)["op"] for line in f]
+
+
+def test_growing_state_is_appended_as_deltas(store):
+    async def main():
+        await store.save("s1", state("a"))
+        await store.save("s1", state("a", "b"))
+        await store.save("s1", state("a", "b", "c"))
+        await store.save("s1", state("a", "b", "c"))  # nothing new: no write
+        return await StateStore(store.directory).load("s1")
+
+    assert texts(asyncio.run(main())) == ["a", "b", "c"]
+    assert records(store, "s1") == ["snapshot", "append", "append"]
+
+
+def test_rewritten_history_or_metadata_takes_a_snapshot(store):
+    async def main():
+        await store.save("s1", state("a", "b"))
+        await store.save("s1", state("b", "c"))  # a bounded context dropped "a"
+        await store.save("s1", state("b", "c", "d", version="2.0.0"))
+        return await StateStore(store.directory).load("s1")
+
+    loaded = asyncio.run(main())
+    assert texts(loaded) == ["b", "c", "d"]
+    assert loaded["version"] == "2.0.0"
+    assert records(store, "s1") == ["snapshot", "snapshot", "snapshot"]
+
+
+def test_unknown_session_loads_as_none(store):
+    assert asyncio.run(store.load("missing")) is None
+
+
+def test_torn_tail_is_ignored_and_truncated(store):
+    async def write():
+        await store.save("s1", state("a", "b", "c"))
+
+    asyncio.run(write())
+    path = store._path("s1")
+    with open(path, "ab") as f:
+        f.write(b'{"op": "append", "session_id": "s1", "messages": [{"content": "d"')
+
+    resumed = StateStore(store.directory)
+
+    async def resume():
+        loaded = await resumed.load("s1")
+        await resumed.save("s1", state("a", "b", "c", "e"))
+        return loaded, await StateStore(store.directory).load("s1")
+
+    loaded, reloaded = asyncio.run(resume())
+    assert texts(loaded) == ["a", "b", "c"]
+    assert texts(reloaded) == ["a", "b", "c", "e"]
+    assert records(store, "s1") == ["snapshot", "append"]
+
+
+def test_snapshot_after_a_torn_tail_starts_on_its_own_line(store):
+    asyncio.run(store.save("s1", state("a")))
+    with open(store._path("s1"), "ab") as f:
+        f.write(b'{"op": "app')
+
+    # A fresh process writes without replaying first
+    asyncio.run(StateStore(store.directory).save("s1", state("x", "y")))
+    assert texts(asyncio.run(StateStore(store.directory).load("s1"))) == ["x", "y"]
+
+
+def test_compaction_rewrites_the_log_as_one_snapshot(tmp_path):
+    store = StateStore(str(tmp_path), compact_after=2)
+    store._schedule_compaction = store._compact  # run inline instead of on a thread
+
+    async def main():
+        for n in range(1, 5):
+            await store.save("s1", state(*"abcd"[:n]))
+
+    asyncio.run(main())
+    assert store.compactions >= 1
+    assert records(store, "s1")[0] == "snapshot"
+    assert texts(asyncio.run(StateStore(str(tmp_path)).load("s1"))) == ["a", "b", "c", "d"]
+
+
+def test_delete_removes_the_log(store):
+    asyncio.run(store.save("s1", state("a")))
+    assert asyncio.run(store.delete("s1")) is True
+    assert asyncio.run(store.delete("s1")) is False
+    assert asyncio.run(store.load("s1")) is None
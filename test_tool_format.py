@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+import tool_format
+from tool_format import TokenSavings, _clock, compact, compact_result
+
+CHENNAI = {
+    "city": "Chennai",
+    "country": "IN",
+    "temperature_celsius": 31.04,
+    "temperature_fahrenheit": 87.9,
+    "feels_like_celsius": 35.6,
+    "humidity": 70,
+    "description": "clear sky",
+    "wind_speed": 3.14,
+    "pressure": 1008,
+    "visibility": 10000,
+    "sunrise": "2024-05-01 00:12:03+00:00",
+    "sunset": "2024-05-01 12:40:00+00:00",
+}
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # The 4-chars-per-token estimate: no tiktoken download, same numbers everywhere
+    monkeypatch.setattr(tool_format, "_encoder", False)
+
+
+def test_compact_keeps_schema_fields_with_short_labels():
+    assert compact(CHENNAI) == (
+        "Chennai,IN: t 31C, feels 36C, clear sky, hum 70%, wind 3.1m/s, p 1008hPa, vis 10km, rise 00:12Z, set 12:40Z"
+    )
+
+
+def test_small_budget_sheds_optional_fields_first():
+    assert compact(CHENNAI, budget=10) == "Chennai,IN: t 31C, clear sky"
+    assert compact(CHENNAI, budget=14) == "Chennai,IN: t 31C, clear sky, hum 70%, wind 3.1m/s"
+
+
+def test_missing_values_and_errors():
+    assert compact({"city": "Oslo", "temperature_celsius": -3, "description": "snow", "visibility": "N/A"}) == (
+        "Oslo: t -3C, snow"
+    )
+    assert compact({"Chennai": CHENNAI, "Atlantis": {"error": "City not found"}}).endswith("\nAtlantis: error City not found")
+    assert compact({}) == ""
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2024-05-01 05:42:10+00:00", "05:42Z"),
+        ("2024-05-01T05:42:10Z", "05:42Z"),
+        ("2024-05-01T05:42:10.250+05:30", "05:42+05:30"),
+        ("2024-05-01 05:42", "05:42"),
+        ("N/A", "N/A"),
+    ],
+)
+def test_clock_keeps_the_utc_offset(value, expected):
+    assert _clock(value) == expected
+
+
+def test_compact_result_converts_dicts_and_keeps_the_signature():
+    @compact_result
+    def get_weather(city: str) -> dict:
+        """Weather for a city"""
+        return CHENNAI if city == "Chennai" else "no data"
+
+    assert get_weather("Chennai").startswith("Chennai,IN: t 31C")
+    assert get_weather("Atlantis") == "no data"
+    assert get_weather.__annotations__["return"] is str
+    assert get_weather.__doc__ == "Weather for a city"
+
+
+def test_compact_result_wraps_coroutines():
+    @compact_result(budget=10)
+    async def get_weather(city: str) -> dict:
+        return CHENNAI
+
+    assert asyncio.run(get_weather("Chennai")) == "Chennai,IN: t 31C, clear sky"
+
+
+def test_token_savings_tally():
+    savings = TokenSavings()
+    saved = savings.record("get_weather", str(CHENNAI), compact(CHENNAI))
+    report = savings.report()["get_weather"]
+    assert report["calls"] == 1
+    assert report["saved_tokens"] == saved > 0
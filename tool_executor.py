@@ -0,0 +1,255 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from autogen_core import CancellationToken
+
+from singleflight import solo
+
+DEFAULT_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "30"))
+MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+# Hedge a call once it runs longer than this quantile of the tool's recent latencies
+HEDGE_QUANTILE = float(os.getenv("TOOL_HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("TOOL_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY = float(os.getenv("TOOL_HEDGE_MIN_DELAY", "0.05"))
+
+
+class ToolTimeoutError(TimeoutError):
+    """Raised when a tool misses its deadline"""
+
+
+class ToolStats:
+    """Per-tool counters; queue wait and execution time are tracked separately"""
+
+    def __init__(self, window=256):
+        # Imported here: agent_metrics pulls in autogen_agentchat, which tool-only users do not need
+        from agent_metrics import RollingHistogram
+
+        self.latency = RollingHistogram(window=window)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.exec_total = 0.0
+        self.exec_max = 0.0
+
+    def record(self, queue_wait, exec_time):
+        self.calls += 1
+        self.queue_wait_total += queue_wait
+        self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+        self.exec_total += exec_time
+        self.exec_max = max(self.exec_max, exec_time)
+
+    def as_dict(self):
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "queue_wait_avg": self.queue_wait_total / calls,
+            "queue_wait_max": self.queue_wait_max,
+            "exec_avg": self.exec_total / calls,
+            "exec_max": self.exec_max,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p95": self.latency.percentile(0.95),
+        }
+
+
+class ToolExecutor:
+    """Runs agent tools off the event loop with per-tool deadlines.
+
+    Sync tools go to a bounded thread pool so a slow pyowm call cannot stall
+    other coroutines; async tools run on the loop under the same deadline.
+    A timed-out sync call cannot be interrupted, so its worker thread stays
+    busy until the call returns.
+
+    Tools marked for hedging get one duplicate request once a call outlives
+    the tool's observed p95 (``hedge_quantile``), and the first successful
+    answer wins. Only idempotent tools (weather lookups) should be hedged.
+    Nothing is hedged until ``hedge_min_samples`` calls have been timed, or
+    while every pool worker is busy.
+    """
+
+    def __init__(
+        self,
+        max_workers=MAX_WORKERS,
+        default_timeout=DEFAULT_TIMEOUT,
+        hedge_quantile=HEDGE_QUANTILE,
+        hedge_min_samples=HEDGE_MIN_SAMPLES,
+        hedge_min_delay=HEDGE_MIN_DELAY,
+    ):
+        self.default_timeout = default_timeout
+        self.max_workers = max_workers
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+        self.stats = {}
+        # Every tool wrapped so far, so profilers can name a tool before its first call
+        self.tool_names = set()
+
+    def _start(self, fn, args, kwargs):
+        """Begin one attempt; returns (future, timing) where timing gains "start" once it runs"""
+        timing = {}
+        if inspect.iscoroutinefunction(fn):
+            timing["start"] = time.perf_counter()
+            return asyncio.ensure_future(fn(*args, **kwargs)), timing
+
+        # Carry context variables (request priority, single-flight solo mode) into the worker
+        context = contextvars.copy_context()
+
+        def call():
+            timing["start"] = time.perf_counter()
+            with self._busy_lock:
+                self._busy += 1
+            try:
+                return context.run(fn, *args, **kwargs)
+            finally:
+                with self._busy_lock:
+                    self._busy -= 1
+
+        return asyncio.get_running_loop().run_in_executor(self._pool, call), timing
+
+    def _hedge_delay(self, stats):
+        if stats.latency.count < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, stats.latency.percentile(self.hedge_quantile))
+
+    async def _race(self, fn, args, kwargs, stats, hedge_after, timings):
+        """Run fn, adding a hedged duplicate after hedge_after seconds.
+
+        Returns (result, index of the winning attempt); the first success wins
+        and the other attempt is cancelled.
+        """
+        primary, timing = self._start(fn, args, kwargs)
+        attempts = [primary]
+        timings.append(timing)
+        try:
+            if hedge_after is not None:
+                await asyncio.wait([primary], timeout=hedge_after)
+                if not primary.done() and self._busy < self.max_workers:
+                    stats.hedges += 1
+                    # The duplicate must not join the slow call through the single-flight layer
+                    with solo():
+                        hedge, timing = self._start(fn, args, kwargs)
+                    attempts.append(hedge)
+                    timings.append(timing)
+
+            pending = set(attempts)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        return attempt.result(), attempts.index(attempt)
+                    error = error or attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+
+    async def run(self, fn, *args, timeout=None, cancellation_token=None, name=None, hedge=False, **kwargs):
+        """Run fn(*args, **kwargs) under a deadline and record its timings"""
+        name = name or fn.__name__
+        timeout = self.default_timeout if timeout is None else timeout
+        stats = self.stats.setdefault(name, ToolStats())
+        hedge_after = self._hedge_delay(stats) if hedge else None
+        timings = []
+        winner = 0
+
+        submitted = time.perf_counter()
+        future = asyncio.ensure_future(self._race(fn, args, kwargs, stats, hedge_after, timings))
+        if cancellation_token is not None:
+            cancellation_token.link_future(future)
+
+        try:
+            result, winner = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise ToolTimeoutError(f"{name} did not finish within {timeout}s") from None
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            finished = time.perf_counter()
+            # Queue wait is the primary's: a hedge starts late on purpose, and that delay is not queueing
+            queued = timings[0].get("start", finished) if timings else finished
+            started = timings[winner].get("start", finished) if timings else finished
+            stats.record(queued - submitted, finished - started)
+
+        if winner:
+            stats.hedge_wins += 1
+        # The hedge threshold tracks the first attempt, even when a hedge beat it,
+        # so the tail being cut stays in the distribution
+        stats.latency.observe(finished - timings[0].get("start", submitted))
+        return result
+
+    def wrap(self, fn, timeout=None, hedge=False):
+        """Return an async tool with fn's signature that runs through this executor.
+
+        The wrapper accepts the ``cancellation_token`` AutoGen passes to tools
+        that declare one, so cancelling the agent run cancels the tool call.
+        AutoGen already gathers the tool calls of one model turn, so wrapped
+        sync tools from the same turn run side by side in the pool.
+        """
+        self.tool_names.add(fn.__name__)
+        signature = inspect.signature(fn)
+        forwards_token = "cancellation_token" in signature.parameters
+
+        @functools.wraps(fn)
+        async def wrapper(*args, cancellation_token: CancellationToken = None, **kwargs):
+            if forwards_token:
+                kwargs["cancellation_token"] = cancellation_token
+            return await self.run(
+                fn, *args, timeout=timeout, cancellation_token=cancellation_token, name=fn.__name__, hedge=hedge, **kwargs
+            )
+
+        if not forwards_token:
+            token = inspect.Parameter("cancellation_token", inspect.Parameter.KEYWORD_ONLY, annotation=CancellationToken)
+            wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), token])
+            wrapper.__annotations__ = {**fn.__annotations__, "cancellation_token": CancellationToken}
+        return wrapper
+
+    def wrap_tools(self, tools, timeouts=None, hedged=()):
+        """Wrap every plain function in a tools list; tool objects pass through unchanged.
+
+        ``hedged`` names the idempotent tools that may get a duplicate request.
+        """
+        timeouts = timeouts or {}
+        return [
+            self.wrap(tool, timeouts.get(tool.__name__), hedge=tool.__name__ in hedged) if inspect.isfunction(tool) else tool
+            for tool in tools
+        ]
+
+    def report(self):
+        """Timing counters for every tool that has run"""
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared executor for the agents in this project
+default_executor = ToolExecutor()
+
+
+def offload_tools(tools, timeouts=None, hedged=()):
+    """Wrap tools with the shared executor"""
+    return default_executor.wrap_tools(tools, timeouts, hedged)
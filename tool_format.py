@@ -0,0 +1,173 @@
+import functools
+import inspect
+import os
+import threading
+from collections import defaultdict
+
+# Default token budget for one tool result (or one block of injected data)
+TOKEN_BUDGET = int(os.getenv("TOOL_RESULT_TOKEN_BUDGET", "200"))
+TOKEN_ENCODING = os.getenv("TOOL_TOKEN_ENCODING", "o200k_base")
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            try:
+                import tiktoken
+
+                _encoder = tiktoken.get_encoding(TOKEN_ENCODING)
+            except Exception:
+                # tiktoken missing or its BPE file not downloadable: fall back to the 4-chars-per-token rule
+                _encoder = False
+        return _encoder
+
+
+def count_tokens(text):
+    """Token count for text, using tiktoken when it is available and an estimate otherwise"""
+    encoder = _get_encoder()
+    if encoder:
+        return len(encoder.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _num(value, digits=0):
+    """Round and drop a trailing .0 (31.0 -> "31")"""
+    value = round(float(value), digits)
+    return f"{value:.{digits}f}".rstrip("0").rstrip(".") if digits else str(int(value))
+
+
+def _clock(value):
+    """Keep HH:MM of an ISO timestamp plus its UTC offset, written "Z" for UTC ("05:42Z")"""
+    text = str(value)
+    if len(text) < 16:
+        return text
+    offset = text[19:].lstrip(".0123456789")
+    return text[11:16] + ("Z" if offset == "+00:00" else offset)
+
+
+# Weather fields in the order they are rendered: (source key, label, render, priority).
+# Fields missing from the schema (Fahrenheit duplicates, country echoes, ...) are dropped;
+# when a result is over budget the highest-priority number goes first. Priority 0 is never dropped.
+WEATHER_SCHEMA = (
+    ("temperature_celsius", "t", lambda v: f"{_num(v)}C", 0),
+    ("feels_like_celsius", "feels", lambda v: f"{_num(v)}C", 2),
+    ("description", "", str, 0),
+    ("humidity", "hum", lambda v: f"{_num(v)}%", 1),
+    ("wind_speed", "wind", lambda v: f"{_num(v, 1)}m/s", 1),
+    ("pressure", "p", lambda v: f"{_num(v)}hPa", 3),
+    ("visibility", "vis", lambda v: f"{_num(float(v) / 1000, 1)}km", 4),
+    ("sunrise", "rise", _clock, 5),
+    ("sunset", "set", _clock, 5),
+)
+
+
+def _place(data, name=None):
+    city = data.get("city") or name or ""
+    country = data.get("country")
+    return f"{city},{country}" if country else city
+
+
+def _render(data, schema, max_priority, name=None):
+    if "error" in data:
+        return f"{_place(data, name)}: error {data['error']}"
+    parts = []
+    for key, label, render, priority in schema:
+        value = data.get(key)
+        if priority > max_priority or value in (None, "", "N/A"):
+            continue
+        try:
+            text = render(value)
+        except (TypeError, ValueError):
+            continue
+        parts.append(f"{label} {text}" if label else text)
+    return f"{_place(data, name)}: {', '.join(parts)}"
+
+
+def compact(data, schema=WEATHER_SCHEMA, budget=TOKEN_BUDGET):
+    """Render a weather dict, or a {place: weather dict} mapping, as compact text within budget tokens.
+
+    Only schema fields are kept, with short labels and rounded values.
+    Optional fields are shed by priority until the text fits; the required ones
+    are always kept, so a very small budget can still be exceeded.
+    """
+    if not data:
+        return ""
+    entries = [(None, data)] if _is_record(data) else list(data.items())
+    priorities = sorted({priority for *_, priority in schema}, reverse=True)
+    for max_priority in priorities:
+        text = "\n".join(_render(entry, schema, max_priority, name) for name, entry in entries)
+        if budget is None or count_tokens(text) <= budget:
+            break
+    return text
+
+
+def _is_record(data):
+    return not all(isinstance(value, dict) for value in data.values())
+
+
+class TokenSavings:
+    """Per-tool tally of tokens the verbose form would have cost versus what was sent"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools = defaultdict(lambda: {"calls": 0, "original_tokens": 0, "compact_tokens": 0})
+
+    def record(self, tool, original, compacted):
+        original_tokens, compact_tokens = count_tokens(original), count_tokens(compacted)
+        with self._lock:
+            entry = self._tools[tool]
+            entry["calls"] += 1
+            entry["original_tokens"] += original_tokens
+            entry["compact_tokens"] += compact_tokens
+        return original_tokens - compact_tokens
+
+    def report(self):
+        with self._lock:
+            return {
+                tool: {**entry, "saved_tokens": entry["original_tokens"] - entry["compact_tokens"]}
+                for tool, entry in self._tools.items()
+            }
+
+
+# Shared tally across all tools and injected context
+savings = TokenSavings()
+
+
+def compact_weather(data, budget=TOKEN_BUDGET, source="weather_context"):
+    """compact() for weather data going into a prompt, recording the savings over its repr"""
+    text = compact(data, budget=budget)
+    savings.record(source, str(data), text)
+    return text
+
+
+def compact_result(fn=None, *, budget=TOKEN_BUDGET, schema=WEATHER_SCHEMA):
+    """Decorator for tools returning weather dicts: the model gets compact text instead of the dict repr"""
+    if fn is None:
+        return functools.partial(compact_result, budget=budget, schema=schema)
+
+    def convert(result):
+        if not isinstance(result, dict):
+            return result
+        text = compact(result, schema=schema, budget=budget)
+        savings.record(fn.__name__, str(result), text)
+        return text
+
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return convert(await fn(*args, **kwargs))
+
+    else:
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return convert(fn(*args, **kwargs))
+
+    wrapper.__annotations__ = {**fn.__annotations__, "return": str}
+    wrapper.__signature__ = inspect.signature(fn).replace(return_annotation=str)
+    return wrapper
@@ -1,105 +1,118 @@
 import asyncio
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from dotenv import load_dotenv
-import os
-from pyowm import OWM
-from pyowm.utils import config
+from lazy_clients import LazyWeatherManager, chat_client, shared
+from weather_cache import cached_weather_at_place
+from weather_tools import get_forecast, get_weather_many
+from weather_snapshot import get_snapshot
+from tool_executor import ToolTimeoutError, default_executor, offload_tools
+from tool_format import compact_result, compact_weather
+from city_matcher import extract_places_async
+from state_store import persist, resume
+from answer_cache import WEATHER_TTL, cached_run
+from loop_profiler import profile_turn
+from stream_tee import stream_reply
 
-load_dotenv()
-
-# Get API keys
-openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
-owm_api_key = os.getenv("OPENWEATHERMAP_API_KEY")
-
-# Initialize OpenWeatherMap
-owm = OWM(owm_api_key)
-weather_mgr = owm.weather_manager()
+# pyowm is imported and connected on the first lookup, not when this module is imported
+weather_mgr = LazyWeatherManager()
 
 def get_weather_info(city_name, country_code="US"):
     """Get current weather information for a city"""
+    # Cities refreshed in bulk by weather_snapshot.py are answered without a network call
+    observation = get_snapshot().lookup(city_name, country_code)
+    if observation is not None:
+        return observation.info(city_name)
     try:
-        # Get weather observation
-        observation = weather_mgr.weather_at_place(f'{city_name},{country_code}')
-        weather = observation.weather
-        
-        # Extract weather details
-        temp_celsius = weather.temperature('celsius')
-        temp_fahrenheit = weather.temperature('fahrenheit')
-        
-        weather_info = {
-            "city": city_name,
-            "temperature_celsius": round(temp_celsius['temp'], 1),
-            "temperature_fahrenheit": round(temp_fahrenheit['temp'], 1),
-            "feels_like_celsius": round(temp_celsius['feels_like'], 1),
-            "feels_like_fahrenheit": round(temp_fahrenheit['feels_like'], 1),
-            "humidity": weather.humidity,
-            "description": weather.detailed_status,
-            "wind_speed": round(weather.wind()['speed'], 1),
-            "pressure": weather.pressure['press'],
-            "visibility": weather.visibility_distance if weather.visibility_distance else "N/A",
-            "sunrise": weather.sunrise_time(timeformat='iso'),
-            "sunset": weather.sunset_time(timeformat='iso')
-        }
-        
-        return weather_info
+        # Get weather observation (served from the shared cache when fresh)
+        observation = cached_weather_at_place(weather_mgr, city_name, country_code)
+        return observation.info(city_name)
     except Exception as e:
         return {"error": f"Could not get weather for {city_name}: {str(e)}"}
 
-# Create the weather-aware assistant agent
-oper_router_client = OpenAIChatCompletionClient(
-    api_key=openrouter_api_key, 
-    model="deepseek/deepseek-chat-v3.1", 
-    base_url="https://openrouter.ai/api/v1", 
-    model_info={
-        "family": "deepseek",
-        "provider": "openrouter/openrouter",
-        "type": "chat",
-        "vision": True,
-        "function_calling": True,
-        "json_output": True,
-        "structured_output": True,
-        "context_length": 8192,
-        "max_tokens": 4096,
-        "supported_features": ["chat", "vision", "function_calling"]
-    }
+agent_tools = offload_tools(
+    [compact_result(get_weather_many), get_forecast], hedged={"get_weather_many", "get_forecast"}
 )
 
-weather_agent = AssistantAgent(
-    model_client=oper_router_client, 
-    name="WeatherAgent", 
-    system_message="""You are a helpful AI Agent Assistant with access to real-time weather information. 
+WEATHER_SYSTEM_MESSAGE = """You are a helpful AI Agent Assistant with access to real-time weather information. 
     You can provide current weather data for any city when users ask about weather conditions.
+    When a question involves several cities, look them all up with a single get_weather_many call.
+    For questions about the coming days, use get_forecast.
     Always be friendly and provide weather information in a clear, easy-to-understand format."""
-)
 
-async def chat_with_weather(question):
-    """Chat with the weather agent"""
+def make_agent(model_client=None, **kwargs):
+    """Build a fresh weather agent; agents keep conversation state, so each conversation needs its own"""
+    from autogen_agentchat.agents import AssistantAgent
+    return AssistantAgent(
+        model_client=model_client or chat_client("openrouter"), 
+        name="WeatherAgent", 
+        tools=agent_tools,
+        system_message=WEATHER_SYSTEM_MESSAGE,
+        **kwargs
+    )
+
+# Built on first use so importing this module stays cheap
+default_agent = shared(make_agent)
+
+async def fetch_weather_info(city_name, country_code=None):
+    """get_weather_info off the event loop, with a deadline and a hedged retry past its p95"""
+    # A snapshot hit is a constant-time read, not worth a trip through the pool
+    observation = get_snapshot().lookup(city_name, country_code or "")
+    if observation is not None:
+        return observation.info(city_name)
+    # pyowm is blocking; keep it off the event loop
+    args = (city_name,) if country_code is None else (city_name, country_code)
+    try:
+        return await default_executor.run(get_weather_info, *args, timeout=10, hedge=True)
+    except ToolTimeoutError as e:
+        return {"error": f"Could not get weather for {city_name}: {e}"}
+
+async def prepare_task(question):
+    """Attach current weather data to a weather question before it goes to the agent"""
     # If the question is about weather, get the data first
-    if any(word in question.lower() for word in ['weather', 'temperature', 'forecast', 'climate']):
-        # Extract city name (simple extraction - you could make this more sophisticated)
-        words = question.split()
-        city_name = None
-        
-        # Look for common city indicators
-        for i, word in enumerate(words):
-            if word.lower() in ['in', 'at', 'for', 'of'] and i + 1 < len(words):
-                city_name = words[i + 1].replace('?', '').replace('.', '').replace(',', '')
-                break
-        
-        if city_name:
-            weather_data = get_weather_info(city_name)
-            if "error" not in weather_data:
-                enhanced_question = f"{question}\n\nHere's the current weather data for {city_name}:\n{weather_data}"
-                result = await weather_agent.run(task=enhanced_question)
-            else:
-                result = await weather_agent.run(task=f"{question}\n\nNote: {weather_data['error']}")
-        else:
-            result = await weather_agent.run(task=question)
+    if not any(word in question.lower() for word in ['weather', 'temperature', 'forecast', 'climate']):
+        return question
+
+    # Every city mentioned (multi-word names and "City, Country" included), found in one pass
+    places = await extract_places_async(question)
+    if not places:
+        return question
+
+    results = await asyncio.gather(*(fetch_weather_info(city, country) for city, country in places))
+    found = {city: data for (city, _), data in zip(places, results) if "error" not in data}
+    notes = [data["error"] for data in results if "error" in data]
+    if len(found) == 1:
+        (city_name, weather_data), = found.items()
+        task = f"{question}\n\nHere's the current weather data for {city_name}:\n{compact_weather(weather_data)}"
+    elif found:
+        task = f"{question}\n\nHere's the current weather data:\n{compact_weather(found)}"
     else:
-        result = await weather_agent.run(task=question)
-    
-    print(result.messages[-1].content)
+        task = question
+    for note in notes:
+        task += f"\n\nNote: {note}"
+    return task
+
+async def chat_with_weather(question, agent=None, session_id=None, stream=False):
+    """Chat with the weather agent; with a session_id the conversation survives restarts.
+
+    With stream=True the answer is printed token by token as the model writes it.
+    """
+    agent = agent or (default_agent(model_client_stream=True) if stream else default_agent())
+    if session_id:
+        await resume(agent, session_id)
+    # LOOP_PROFILE=stalls|sample|cprofile records what held up the event loop during the turn
+    async with profile_turn(agent.name):
+        task = await prepare_task(question)
+        if stream:
+            await stream_reply(agent, task)
+        elif session_id:
+            result = await agent.run(task=task)
+            print(result.messages[-1].content)
+        else:
+            # The task carries live weather, so a reused answer only lives as long as that data
+            # and only serves questions about the same places
+            places = await extract_places_async(question)
+            key = ";".join(f"{city},{country or ''}".casefold() for city, country in places)
+            print(await cached_run(agent, question, task, ttl=WEATHER_TTL, key=key))
+    if session_id:
+        await persist(agent, session_id)
 
 if __name__ == "__main__":
     # Test weather functionality
@@ -116,4 +129,4 @@ if __name__ == "__main__":
     print("="*50)
     
     # Start the chat
-    asyncio.run(chat_with_weather("What's the weather like in Chennai?"))
+    asyncio.run(chat_with_weather("What's the weather like in Chennai?", stream=True))
@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from owm_scheduler import BACKGROUND, request_priority
+from singleflight import SingleFlight
+from weather_model import WeatherObservation
+
+
+def normalize_key(city, country=""):
+    """Normalize a city/country pair into a cache key"""
+    return (" ".join(city.split()).casefold(), (country or "").strip().upper())
+
+
+class WeatherCache:
+    """Bounded TTL + LRU cache with stale-while-revalidate refresh"""
+
+    def __init__(self, max_size=512, ttl=600.0, stale_ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def get_or_fetch(self, key, fetch):
+        """Return the cached value for key, calling fetch() on a miss.
+
+        Entries older than ``ttl`` but younger than ``ttl + stale_ttl`` are
+        served as-is while a background thread refreshes them.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    self._schedule_refresh(key, fetch)
+                    return value
+                del self._entries[key]
+            self.misses += 1
+
+        value = fetch()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store value under key, evicting least recently used entries"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Drop one key, or every entry when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        """Return hit/miss/eviction counters"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+            }
+
+    def _schedule_refresh(self, key, fetch):
+        # Caller holds the lock; at most one refresh per key is in flight
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+
+    def _refresh(self, key, fetch):
+        try:
+            # Refreshes queue behind interactive lookups
+            with request_priority(BACKGROUND):
+                value = fetch()
+        except Exception:
+            # Keep serving the stale value; the next miss will retry
+            with self._lock:
+                self.refresh_errors += 1
+        else:
+            self.put(key, value)
+            with self._lock:
+                self.refreshes += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+# Shared cache used by every pyowm lookup in the project
+weather_cache = WeatherCache(
+    max_size=int(os.getenv("WEATHER_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("WEATHER_CACHE_TTL", "600")),
+    stale_ttl=float(os.getenv("WEATHER_CACHE_STALE_TTL", "300")),
+)
+
+
+# Concurrent misses for the same place share one upstream call
+weather_flights = SingleFlight()
+
+
+def cached_weather_at_place(mgr, city, country="", cache=None):
+    """Return a WeatherObservation for city/country through the shared cache"""
+    cache = cache or weather_cache
+    place = f"{city},{country}" if country else city
+    key = normalize_key(city, country)
+    # pyowm observations carry every unit, so the flight key uses OWM's default "standard"
+    flight_key = (*key, "standard")
+    # Only the slotted record is kept; pyowm's object graph is dropped right after the fetch
+    return cache.get_or_fetch(
+        key, lambda: weather_flights.do(flight_key, lambda: WeatherObservation.from_pyowm(mgr.weather_at_place(place)))
+    )
@@ -0,0 +1,188 @@
+import json
+import os
+from datetime import datetime, timezone
+
+# "auto" uses orjson when it is installed; "json" forces the standard library
+JSON_BACKEND = os.getenv("WEATHER_JSON_BACKEND", "auto")
+
+loads = json.loads
+if JSON_BACKEND != "json":
+    try:
+        from orjson import loads
+    except ImportError:
+        JSON_BACKEND = "json"
+    else:
+        JSON_BACKEND = "orjson"
+
+# Keys of the per-city result get_weather_many hands the model
+SUMMARY_FIELDS = ("city", "country", "temperature_celsius", "feels_like_celsius", "humidity", "description", "wind_speed")
+
+_TO_CELSIUS = {
+    "metric": lambda t: t,
+    "imperial": lambda t: (t - 32) * 5 / 9,
+    "standard": lambda t: t - 273.15,
+}
+
+
+def fahrenheit(celsius):
+    return celsius * 9 / 5 + 32
+
+
+def iso_time(timestamp):
+    """Unix time in pyowm's timeformat='iso' form, or "N/A" when unknown"""
+    if not timestamp:
+        return "N/A"
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M:%S+00:00")
+
+
+class WeatherObservation:
+    """Current conditions for one place, in the units every tool uses (°C, m/s, hPa, metres, Unix time).
+
+    One of these replaces the raw OWM payload dict or the pyowm object graph
+    wherever an observation is kept: the weather caches, the single-flight
+    results, the weather snapshot. Missing values are None.
+    """
+
+    __slots__ = (
+        "city",
+        "country",
+        "lat",
+        "lon",
+        "temp",
+        "feels_like",
+        "humidity",
+        "pressure",
+        "wind_speed",
+        "visibility",
+        "description",
+        "sunrise",
+        "sunset",
+        "observed_at",
+    )
+
+    def __init__(
+        self,
+        city,
+        country,
+        temp,
+        feels_like,
+        humidity,
+        description,
+        wind_speed,
+        pressure=None,
+        visibility=None,
+        sunrise=None,
+        sunset=None,
+        observed_at=None,
+        lat=None,
+        lon=None,
+    ):
+        self.city = city
+        self.country = country
+        self.lat = lat
+        self.lon = lon
+        self.temp = temp
+        self.feels_like = feels_like
+        self.humidity = humidity
+        self.pressure = pressure
+        self.wind_speed = wind_speed
+        self.visibility = visibility
+        self.description = description
+        self.sunrise = sunrise
+        self.sunset = sunset
+        self.observed_at = observed_at
+
+    @classmethod
+    def from_owm(cls, payload, units="metric"):
+        """Build from a decoded OWM current-weather payload, reading each section once"""
+        to_celsius = _TO_CELSIUS[units]
+        main = payload["main"]
+        sys_info = payload.get("sys") or {}
+        coord = payload.get("coord") or {}
+        wind_speed = (payload.get("wind") or {}).get("speed")
+        if wind_speed is not None and units == "imperial":
+            wind_speed *= 0.44704  # mph
+        return cls(
+            payload.get("name", ""),
+            sys_info.get("country", ""),
+            to_celsius(main["temp"]),
+            to_celsius(main["feels_like"]),
+            main.get("humidity"),
+            payload["weather"][0]["description"],
+            wind_speed,
+            main.get("pressure"),
+            payload.get("visibility"),
+            sys_info.get("sunrise"),
+            sys_info.get("sunset"),
+            payload.get("dt"),
+            coord.get("lat"),
+            coord.get("lon"),
+        )
+
+    @classmethod
+    def from_json(cls, body, units="metric"):
+        """Build from a raw OWM response body (bytes or str) with the fastest available JSON backend"""
+        return cls.from_owm(loads(body), units)
+
+    @classmethod
+    def from_pyowm(cls, observation):
+        """Build from a pyowm Observation, keeping nothing of its object graph"""
+        weather = observation.weather
+        location = observation.location
+        celsius = weather.temperature("celsius")
+        return cls(
+            location.name,
+            location.country or "",
+            celsius["temp"],
+            celsius["feels_like"],
+            weather.humidity,
+            weather.detailed_status,
+            weather.wind().get("speed"),
+            weather.pressure.get("press"),
+            weather.visibility_distance,
+            weather.sunrise_time(),
+            weather.sunset_time(),
+            weather.reference_time(),
+            location.lat,
+            location.lon,
+        )
+
+    def summary(self):
+        """The compact per-city result of get_weather_many (SUMMARY_FIELDS)"""
+        return {
+            "city": self.city,
+            "country": self.country,
+            "temperature_celsius": round(self.temp, 1),
+            "feels_like_celsius": round(self.feels_like, 1),
+            "humidity": self.humidity,
+            "description": self.description,
+            "wind_speed": round(self.wind_speed or 0.0, 1),
+        }
+
+    def info(self, city=None):
+        """The detailed result of the weather agent's get_weather_info, labelled with city when given"""
+        return {
+            "city": city or self.city,
+            "temperature_celsius": round(self.temp, 1),
+            "temperature_fahrenheit": round(fahrenheit(self.temp), 1),
+            "feels_like_celsius": round(self.feels_like, 1),
+            "feels_like_fahrenheit": round(fahrenheit(self.feels_like), 1),
+            "humidity": self.humidity,
+            "description": self.description,
+            "wind_speed": round(self.wind_speed or 0.0, 1),
+            "pressure": self.pressure,
+            "visibility": self.visibility or "N/A",
+            "sunrise": iso_time(self.sunrise),
+            "sunset": iso_time(self.sunset),
+        }
+
+    def describe(self):
+        """One line of text for tools that answer in prose"""
+        place = f"{self.city}, {self.country}" if self.country else self.city
+        return (
+            f"{place}: {self.temp:g}°C (feels like {self.feels_like:g}°C), {self.description}, "
+            f"humidity {self.humidity}%, wind {self.wind_speed} m/s"
+        )
+
+    def __repr__(self):
+        return f"WeatherObservation({self.city!r}, {self.country!r}, temp={self.temp:g}, {self.description!r})"
@@ -0,0 +1,329 @@
+import asyncio
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from geocode_index import normalize_name
+from weather_model import WeatherObservation
+
+SNAPSHOT_PATH = os.getenv("WEATHER_SNAPSHOT_PATH", os.path.join("data", "weather.snap"))
+CITIES_PATH = os.getenv("WEATHER_SNAPSHOT_CITIES", os.path.join("data", "snapshot_cities.txt"))
+REFRESH_INTERVAL = float(os.getenv("WEATHER_SNAPSHOT_INTERVAL", "600"))
+# Entries older than this are treated as missing, so the tools go upstream instead
+MAX_AGE = float(os.getenv("WEATHER_SNAPSHOT_MAX_AGE", "1800"))
+CONCURRENCY = int(os.getenv("WEATHER_SNAPSHOT_CONCURRENCY", "32"))
+# How often a reader checks whether the refresher swapped in a new file
+RELOAD_CHECK = 1.0
+
+MAGIC = b"WXSNAP1\0"
+# magic, slot count (a power of two), record count, written at
+HEADER = struct.Struct("<8sIId")
+# 1-based record number, 0 for an empty slot
+SLOT = struct.Struct("<I")
+# normalized name, ISO country code, display name, description, fetched at, observed at,
+# temp, feels like, humidity, pressure, wind speed, visibility, sunrise, sunset
+RECORD = struct.Struct("<40s2s40s32sIIffBHfIII")
+NAME_WIDTH = 40
+
+
+def _key(city, country=""):
+    return normalize_name(city).encode("utf-8")[:NAME_WIDTH], (country or "").strip().upper().encode("ascii", "ignore")[:2]
+
+
+def _slot_hash(name, country):
+    # Stable across processes, unlike hash(); readers and the writer must agree
+    return zlib.crc32(name + b"\0" + country)
+
+
+def _text(raw, width):
+    # Cut on a character boundary so the stored bytes always decode
+    return raw.encode("utf-8")[:width].decode("utf-8", "ignore").encode("utf-8")
+
+
+def pack_observation(observation, city, country="", fetched_at=None):
+    """Fixed-width record for a WeatherObservation, keyed by the city/country it was asked for"""
+    name, country = _key(city, country or observation.country)
+    return RECORD.pack(
+        name,
+        country,
+        _text(observation.city or city, NAME_WIDTH),
+        _text(observation.description, 32),
+        int(fetched_at or time.time()),
+        int(observation.observed_at or 0),
+        observation.temp,
+        observation.feels_like,
+        min(255, int(observation.humidity or 0)),
+        min(65535, int(observation.pressure or 0)),
+        observation.wind_speed or 0.0,
+        int(observation.visibility or 0),
+        int(observation.sunrise or 0),
+        int(observation.sunset or 0),
+    )
+
+
+def write_snapshot(path, records):
+    """Write packed records as a snapshot file, replacing any previous one atomically.
+
+    Each record is reachable by (name, country); a lookup by name alone gets
+    the first record with that name, so list preferred cities first.
+    """
+    records = list(records)
+    slots = 8
+    while slots < 4 * max(1, len(records)):
+        slots *= 2  # at most half full, counting the name-only aliases
+    table = bytearray(slots * SLOT.size)
+    mask = slots - 1
+
+    def place(name, country, number):
+        i = _slot_hash(name, country) & mask
+        while True:
+            taken = SLOT.unpack_from(table, i * SLOT.size)[0]
+            if not taken:
+                SLOT.pack_into(table, i * SLOT.size, number)
+                return True
+            other = RECORD.unpack_from(records[taken - 1])
+            if other[0].rstrip(b"\0") == name and (not country or other[1].rstrip(b"\0") == country):
+                return False
+            i = (i + 1) & mask
+
+    for number, record in enumerate(records, 1):
+        name, country = (field.rstrip(b"\0") for field in RECORD.unpack_from(record)[:2])
+        place(name, country, number)
+        place(name, b"", number)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, slots, len(records), time.time()))
+        f.write(table)
+        for record in records:
+            f.write(record)
+        f.flush()
+        os.fsync(f.fileno())
+    # Readers holding the old map keep reading it until they notice the new file
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class _Mapping:
+    """One mapped snapshot file; replaced as a whole, never modified"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.slots, self.count, self.written_at = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.mm.close()
+            raise ValueError(f"{path} is not a weather snapshot")
+        self.mask = self.slots - 1
+        self.records_at = HEADER.size + self.slots * SLOT.size
+
+    def record(self, number):
+        return RECORD.unpack_from(self.mm, self.records_at + (number - 1) * RECORD.size)
+
+    def find(self, name, country):
+        i = _slot_hash(name, country) & self.mask
+        while True:
+            number = SLOT.unpack_from(self.mm, HEADER.size + i * SLOT.size)[0]
+            if not number:
+                return None
+            record = self.record(number)
+            if record[0].rstrip(b"\0") == name and (not country or record[1].rstrip(b"\0") == country):
+                return record
+            i = (i + 1) & self.mask
+
+
+class WeatherSnapshot:
+    """Constant-time city -> current weather lookups over a memory-mapped snapshot file.
+
+    The file is an open-addressing hash table of record numbers followed by
+    fixed-width records, written by ``refresh_snapshot``. When the refresher
+    swaps in a new file, readers pick it up within ``RELOAD_CHECK`` seconds.
+    Entries fetched more than ``max_age`` seconds ago count as missing.
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH, max_age=MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._mapping = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._reload()
+
+    def _reload(self):
+        self._checked = time.monotonic()
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._mapping = None
+            return
+        current = self._mapping
+        if current is not None and (current.stat.st_ino, current.stat.st_mtime_ns) == (stat.st_ino, stat.st_mtime_ns):
+            return
+        if stat.st_size < HEADER.size:
+            return
+        # The old map is not closed: a reader on another thread may still hold it
+        self._mapping = _Mapping(self.path)
+
+    def _current(self):
+        if time.monotonic() - self._checked >= RELOAD_CHECK:
+            with self._lock:
+                if time.monotonic() - self._checked >= RELOAD_CHECK:
+                    self._reload()
+        return self._mapping
+
+    def __len__(self):
+        mapping = self._current()
+        return mapping.count if mapping else 0
+
+    def age(self):
+        """Seconds since the current file was written, or None without one"""
+        mapping = self._current()
+        return time.time() - mapping.written_at if mapping else None
+
+    def lookup(self, city, country=""):
+        """WeatherObservation for a city, or None when it is not in the snapshot or too old"""
+        mapping = self._current()
+        record = mapping.find(*_key(city, country)) if mapping else None
+        if record is None or time.time() - record[4] > self.max_age:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _observation(record)
+
+    def records(self):
+        """Yield (normalized name, country, packed record) for every entry"""
+        mapping = self._current()
+        for number in range(1, (mapping.count if mapping else 0) + 1):
+            offset = mapping.records_at + (number - 1) * RECORD.size
+            raw = bytes(mapping.mm[offset:offset + RECORD.size])
+            name, country = RECORD.unpack_from(raw)[:2]
+            yield name.rstrip(b"\0"), country.rstrip(b"\0"), raw
+
+    def stats(self):
+        return {"cities": len(self), "age_seconds": self.age(), "hits": self.hits, "misses": self.misses}
+
+
+def _observation(record):
+    _, country, display, description, _, observed, temp, feels_like, humidity, pressure, wind, visibility, sunrise, sunset = record
+    # float32 storage: round away the representation noise
+    return WeatherObservation(
+        display.rstrip(b"\0").decode("utf-8", "ignore"),
+        country.rstrip(b"\0").decode("ascii"),
+        round(temp, 2),
+        round(feels_like, 2),
+        humidity,
+        description.rstrip(b"\0").decode("utf-8", "ignore"),
+        round(wind, 2),
+        pressure or None,
+        visibility or None,
+        sunrise or None,
+        sunset or None,
+        observed or None,
+    )
+
+
+def load_cities(path=CITIES_PATH):
+    """(city, country) pairs from a file of "City" or "City,CountryCode" lines, in file order"""
+    cities = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            city, _, country = line.replace("\t", ",").partition(",")
+            cities.append((city.strip(), country.strip().split(",")[0].strip()))
+    return cities
+
+
+async def refresh_snapshot(cities, path=SNAPSHOT_PATH, client=None, concurrency=CONCURRENCY):
+    """Fetch current weather for every city and atomically replace the snapshot file.
+
+    Uses the pooled async OWM client at background priority, so interactive
+    lookups are scheduled first. A city that fails keeps its previous record,
+    which ages out of lookups after MAX_AGE. Returns refresh counters.
+    """
+    from owm_client import get_client
+    from owm_scheduler import BACKGROUND, request_priority
+
+    client = client or get_client()
+    previous = {}
+    if os.path.exists(path):
+        previous = {(name, country): raw for name, country, raw in WeatherSnapshot(path).records()}
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    async def fetch(city, country):
+        """(packed record or None, whether it is new)"""
+        async with semaphore:
+            try:
+                with request_priority(BACKGROUND):
+                    observation = await client.weather_by_city(city, country)
+                return pack_observation(observation, city, country), True
+            except Exception as e:
+                print(f"⚠️ Snapshot refresh failed for {city}: {str(e) or type(e).__name__}", file=sys.stderr)
+                name, code = _key(city, country)
+                if code:
+                    return previous.get((name, code)), False
+                return next((raw for (n, _), raw in previous.items() if n == name), None), False
+
+    places = list(dict.fromkeys(cities))
+    results = await asyncio.gather(*(fetch(city, country) for city, country in places))
+    records = [record for record, _ in results if record is not None]
+    fresh = sum(1 for record, new in results if new)
+    write_snapshot(path, records)
+    return {"cities": len(places), "refreshed": fresh, "kept": len(records) - fresh, "seconds": time.perf_counter() - started}
+
+
+async def run_refresher(cities, path=SNAPSHOT_PATH, interval=REFRESH_INTERVAL, client=None):
+    """Refresh the snapshot every ``interval`` seconds, start to start, until cancelled"""
+    while True:
+        started = time.monotonic()
+        result = await refresh_snapshot(cities, path, client)
+        print(f"🗂️ Snapshot: {result['refreshed']}/{result['cities']} cities refreshed in {result['seconds']:.1f}s")
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+_snapshot = None
+
+
+def get_snapshot():
+    """Return the process-wide snapshot reader for SNAPSHOT_PATH"""
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = WeatherSnapshot(SNAPSHOT_PATH)
+    return _snapshot
+
+
+async def _refresh_main(cities_path, once):
+    from owm_client import get_client
+
+    try:
+        cities = load_cities(cities_path)
+        if once:
+            result = await refresh_snapshot(cities)
+            print(f"✅ Wrote {SNAPSHOT_PATH}: {result['refreshed']}/{result['cities']} cities refreshed in {result['seconds']:.1f}s")
+        else:
+            await run_refresher(cities)
+    finally:
+        await get_client().close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] in ("refresh", "serve"):
+        asyncio.run(_refresh_main(sys.argv[2] if len(sys.argv) > 2 else CITIES_PATH, once=sys.argv[1] == "refresh"))
+    elif len(sys.argv) >= 3 and sys.argv[1] == "lookup":
+        city, _, country = " ".join(sys.argv[2:]).partition(",")
+        print(get_snapshot().lookup(city.strip(), country.strip()) or f"❌ {city} is not in {SNAPSHOT_PATH}")
+    else:
+        print("Usage: python weather_snapshot.py refresh [cities.txt]   # once")
+        print("       python weather_snapshot.py serve [cities.txt]     # every WEATHER_SNAPSHOT_INTERVAL seconds")
+        print("       python weather_snapshot.py lookup <City[,CC]>")
@@ -0,0 +1,53 @@
+import asyncio
+import os
+
+from forecast_store import forecast_store
+from owm_client import get_client
+from weather_cache import normalize_key
+from weather_snapshot import get_snapshot
+
+# Upper bound on simultaneous upstream lookups for one batch
+MAX_CONCURRENCY = int(os.getenv("WEATHER_MAX_CONCURRENCY", "8"))
+
+
+def split_place(place):
+    """Split "City" or "City,CountryCode" into (city, country)"""
+    city, _, country = place.partition(",")
+    return city.strip(), country.strip()
+
+
+async def get_weather_many(cities: list[str]) -> dict:
+    """Get current weather for several cities at once. Each entry is "City" or "City,CountryCode".
+    Returns one result per city; cities that fail carry an "error" entry instead of weather data."""
+    client = get_client()
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def fetch(place):
+        city, country = split_place(place)
+        snapshot = get_snapshot().lookup(city, country)
+        if snapshot is not None:
+            return place, snapshot.summary()
+        async with semaphore:
+            try:
+                return place, (await client.weather_by_city(city, country)).summary()
+            except Exception as e:
+                return place, {"error": f"Could not get weather for {city}: {str(e) or type(e).__name__}"}
+
+    # Duplicate entries are fetched once
+    results = await asyncio.gather(*(fetch(place) for place in dict.fromkeys(cities)))
+    return dict(results)
+
+
+async def get_forecast(city: str, country: str = "", days: int = 3, above_celsius: float | None = None) -> dict:
+    """Get the daily forecast for a city: min/max/mean temperature, humidity and peak wind per day.
+    Pass above_celsius to also list the 3-hour periods warmer than that temperature."""
+    key = normalize_key(city, country)
+    try:
+        if not forecast_store.fresh(key):
+            forecast_store.put_owm(key, await get_client().forecast_by_city(city, country))
+        result = {"city": city, "daily": forecast_store.daily(key, days)}
+        if above_celsius is not None:
+            result["periods_above"] = forecast_store.periods_where(key, "temp", ">", above_celsius)
+        return result
+    except Exception as e:
+        return {"error": f"Could not get forecast for {city}: {str(e) or type(e).__name__}"}